@@ -0,0 +1,187 @@
+''' benchmarks of the heuristics, run as: python -O bench.py <name> (without a name all of them are run) '''
+import sys
+import time
+import numpy as np
+
+
+def bench_two_opt(sizes: tuple = (200, 500, 1000)) -> None:
+    ''' first improvement vs best improvement 2-opt (numpy engine), starting from the nearest neighbor tour
+    sizes: tuple - number of cities of each instance
+    '''
+    from scip_tsp import make_random_instance
+    from tsp import nearest_neighbor, two_opt_np, cost
+    print(f"{'n':>6} {'engine':>6} {'moves':>6} {'time (s)':>9} {'cost':>9}")
+    for n in sizes:
+        np.random.seed(n)
+        points, c = make_random_instance(n)
+        nn_tour = nearest_neighbor(c)
+        for best in (False, True):
+            tour = list(nn_tour)
+            moves = 0
+            start = time.time()
+            while two_opt_np(c, tour, best=best):
+                moves += 1
+            elapsed = time.time() - start
+            print(f"{n:6d} {'best' if best else 'first':>6} {moves:6d} {elapsed:9.3f} {cost(c, tour):9.4f}")
+
+
+def bench_distance_matrix(sizes: tuple = (1000, 2000, 5000)) -> None:
+    ''' blocked distance matrix builder vs the (n, n, 2) broadcast expression
+    sizes: tuple - number of points of each instance
+    '''
+    import tempfile
+    import os
+    from distance import distance_matrix
+    print(f"{'n':>6} {'method':>16} {'time (s)':>9} {'Mpairs/s':>9} {'max error':>10}")
+    for n in sizes:
+        points = np.random.rand(n, 2)
+        start = time.time()
+        ref = np.linalg.norm(points[:, None] - points, axis=-1)
+        elapsed = time.time() - start
+        print(f"{n:6d} {'broadcast':>16} {elapsed:9.3f} {n * n / elapsed / 1e6:9.1f} {0:10.1e}")
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, kwargs in (('blocked float64', {}), ('blocked float32', {'dtype': np.float32}),
+                                 ('memmap float32', {'dtype': np.float32, 'out': os.path.join(tmp, 'c.npy')})):
+                start = time.time()
+                c = distance_matrix(points, **kwargs)
+                elapsed = time.time() - start
+                error = np.abs(c - ref).max()
+                print(f"{n:6d} {name:>16} {elapsed:9.3f} {n * n / elapsed / 1e6:9.1f} {error:10.1e}")
+                del c
+
+
+def bench_knapsack(sizes: tuple = (1000, 10000, 100000)) -> None:
+    ''' core branch and bound vs dynamic programming vs SCIP, on uncorrelated, weakly correlated and strongly
+    correlated (value = weight + 100) instances with weights in 1..1000 and capacity half of the total weight.
+    The DP is skipped when the table is too large (on the strongly correlated instances the branch and bound falls
+    back to the Pareto DP from the break solution)
+    sizes: tuple - number of items of each instance
+    '''
+    from knapsack import _knapsack_core, _dp_packed
+    from scip_knapsack import knapsack as scip_knapsack
+    print(f"{'n':>7} {'kind':>7} {'method':>6} {'time (s)':>9} {'value':>10}")
+    for n in sizes:
+        rng = np.random.default_rng(n)
+        weights = rng.integers(1, 1001, n)
+        W = int(weights.sum() // 2)
+        for kind in ('uncorr', 'weak', 'strong'):
+            if kind == 'uncorr':
+                values = rng.integers(1, 1001, n)
+            elif kind == 'weak':
+                values = np.maximum(weights + rng.integers(-100, 101, n), 1)
+            else:
+                values = weights + 100
+            methods = [('bb', lambda: _knapsack_core(weights, values, W)[1])]
+            if n * (W + 1) <= 1 << 31:
+                methods.append(('dp', lambda: _dp_packed(weights, values, W)[1]))
+            methods.append(('scip', lambda: scip_knapsack(W, values.tolist(), weights.tolist())[0]))
+            for name, solve in methods:
+                start = time.time()
+                value = solve()
+                print(f"{n:7d} {kind:>7} {name:>6} {time.time() - start:9.3f} {value:10.0f}")
+
+
+def bench_bpp(sizes: tuple = (10**4, 10**5, 10**6), C: int = 1000) -> None:
+    ''' first fit, best fit and worst fit decreasing, with weights uniform in 1..2C/3
+    sizes: tuple - number of items of each instance
+    C: int - capacity of the bins
+    '''
+    from bpp import first_fit, best_fit, worst_fit
+    print(f"{'n':>8} {'heuristic':>10} {'time (s)':>9} {'bins':>8} {'lb':>8}")
+    for n in sizes:
+        w = np.random.default_rng(n).integers(1, 2*C//3, n)
+        lb = int(np.ceil(w.sum() / C))
+        for f in (first_fit, best_fit, worst_fit):
+            start = time.time()
+            packing = f(w, C)
+            print(f"{n:8d} {f.__name__:>10} {time.time() - start:9.3f} {len(packing):8d} {lb:8d}")
+
+
+def bench_online_bpp(n: int = 10**6, C: int = 1000, chunk: int = 10000) -> None:
+    ''' throughput of the online packer, with a stream of weights uniform in 1..2C/3 given one by one or in chunks
+    n: int - number of items of the stream
+    C: int - capacity of the bins
+    chunk: int - number of items of each chunk
+    '''
+    from bpp import online_fit
+    print(f"{'policy':>8} {'k':>3} {'input':>6} {'items/s':>10} {'bins':>8} {'lb':>8}")
+    w = np.random.default_rng(0).integers(1, 2*C//3, n)
+    lb = int(np.ceil(w.sum() / C))
+    for policy in ('next_k', 'harmonic'):
+        for k in (2, 4, 8):
+            for name, stream in (('items', iter(w.tolist())), ('chunks', (w[s:s + chunk] for s in range(0, n, chunk)))):
+                start = time.time()
+                bins = sum(1 for _ in online_fit(stream, C, k, policy))
+                print(f"{policy:>8} {k:3d} {name:>6} {n / (time.time() - start):10.0f} {bins:8d} {lb:8d}")
+
+
+def bench_bpp_models(sizes: tuple = (30, 50, 100, 200, 1000, 5000), C: int = 100, baseline: int = 50,
+                     compact: int = 200) -> None:
+    ''' size and solving time of the bin packing models: assignment (bpp, without the reduction), compact over the
+    distinct weights, arc-flow and column generation (the size is the number of columns and rows of the master),
+    with weights uniform in 1..2C/3
+    sizes: tuple - number of items of each instance
+    C: int - capacity of the bins
+    baseline: int - largest instance solved with the assignment model
+    compact: int - largest instance solved with the compact model (its size grows with the number of bins)
+    '''
+    from scip_bpp import bpp, bpp_compact, bpp_arcflow, bpp_colgen
+    from bpp_bounds import l3_bound
+    print(f"{'n':>6} {'model':>10} {'vars':>8} {'conss':>8} {'time (s)':>9} {'bins':>6} {'lb':>6}")
+    for n in sizes:
+        w = np.random.default_rng(n).integers(1, 2*C//3, n)
+        lb = l3_bound(w, C)
+        models = [('arcflow', lambda info: bpp_arcflow(w, C, lb, info=info)),
+                  ('colgen', lambda info: bpp_colgen(w, C, lb, info=info))]
+        if n <= compact:
+            models.insert(0, ('compact', lambda info: bpp_compact(w, C, lb, info=info)))
+        if n <= baseline:
+            models.insert(0, ('assign', lambda info: bpp(n, n, w, C, lb, reduce=False, info=info)))
+        for name, solve in models:
+            info = {}
+            packing = solve(info)
+            print(f"{n:6d} {name:>10} {info['vars']:8d} {info['conss']:8d} {info['time']:9.3f} {len(packing):6d} {lb:6d}")
+
+
+def bench_cutting_stock(sizes: tuple = (5000, 20000), C: int = 10000, types: int = 200) -> None:
+    ''' column generation on cutting stock instances: the weights are drawn from a few distinct sizes uniform in
+    C/10..C/2 (about 3 items per bin, the hard case for the heuristics)
+    sizes: tuple - number of items of each instance
+    C: int - capacity of the bins
+    types: int - number of distinct sizes
+    '''
+    from bpp import best_fit
+    from bpp_bounds import l3_bound
+    from scip_bpp import bpp_colgen
+    print(f"{'n':>6} {'types':>6} {'columns':>8} {'time (s)':>9} {'bins':>6} {'best_fit':>8} {'lb':>6}")
+    for n in sizes:
+        rng = np.random.default_rng(n)
+        w = rng.choice(rng.integers(C // 10, C // 2, types), n)
+        lb = l3_bound(w, C)
+        info = {}
+        packing = bpp_colgen(w, C, lb, info=info)
+        print(f"{n:6d} {info['conss']:6d} {info['vars']:8d} {info['time']:9.3f} {len(packing):6d} "
+              f"{len(best_fit(w, C)):8d} {max(lb, info['lp_bound']):6d}")
+
+
+def bench_setcover(sizes: tuple = (10**4, 10**5), repetitions: int = 10) -> None:
+    ''' greedy and randomized greedy set cover on random instances with as many sets as items
+    sizes: tuple - number of items (and of sets) of each instance
+    repetitions: int - maximum number of sets of each item
+    '''
+    from setcover import make_random_instance, greedy, greedy_randomized
+    print(f"{'n':>7} {'heuristic':>18} {'time (s)':>9} {'sets':>7}")
+    for n in sizes:
+        np.random.seed(n)
+        _, sets, _ = make_random_instance(itens=n, n_sets=n, max_item_repetitions=repetitions)
+        for f in (greedy, greedy_randomized):
+            start = time.time()
+            cover = f(sets)
+            print(f"{n:7d} {f.__name__:>18} {time.time() - start:9.3f} {len(cover):7d}")
+
+
+if __name__ == "__main__":
+    benchmarks = {name[6:]: f for name, f in list(globals().items()) if name.startswith('bench_')}
+    for name in sys.argv[1:] or benchmarks:
+        print(f"== {name}")
+        benchmarks[name]()
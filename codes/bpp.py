@@ -1,169 +1,310 @@
+from bisect import bisect_left, insort
+import heapq
 import numpy as np
+from bpp_bounds import l3_bound
 
 
-def first_fit(w: np.array, C: int, sort_dec: bool = True) -> tuple:
+class Packing:
+    ''' solution of the bin packing problem: assign[i] is the bin of item i, loads[j] is the load of bin j and
+    items[j] are the indices of the items in bin j. It unpacks as the (loads, bins) tuple returned before,
+    with bins[j] the list of the weights in bin j.
     '''
+
+    def __init__(self, assign: np.array, w: np.array, loads: np.array = None):
+        '''
+        assign: np.array - bin of each item
+        w: np.array - list of weights of each item
+        loads: np.array - load of each bin (computed from assign if not given)
+        '''
+        self.assign = np.asarray(assign, dtype=np.int32)
+        self.w = np.asarray(w)
+        if loads is None:
+            loads = np.zeros(self.assign.max(initial=-1) + 1, dtype=self.w.dtype)
+            np.add.at(loads, self.assign, self.w)
+        self.loads = np.asarray(loads)
+        self._items = None
+
+    @property
+    def items(self) -> list:
+        ''' indices of the items in each bin, as a list of np.array '''
+        if self._items is None:
+            order = np.argsort(self.assign, kind='stable')
+            counts = np.bincount(self.assign, minlength=len(self.loads))
+            self._items = np.split(order, np.cumsum(counts)[:-1])
+        return self._items
+
+    def __len__(self) -> int:
+        ''' number of bins '''
+        return len(self.loads)
+
+    def __iter__(self):
+        ''' (loads, bins) as lists, bins[j] is the list of the weights in bin j '''
+        return iter((self.loads.tolist(), [self.w[idx].tolist() for idx in self.items]))
+
+    def __repr__(self) -> str:
+        return f"Packing(bins={len(self)}, loads={self.loads.tolist()})"
+
+    def compact(self) -> 'Packing':
+        ''' the same packing without the empty bins '''
+        used = np.bincount(self.assign, minlength=len(self.loads)) > 0  # bins with at least one item
+        if used.all():
+            return self
+        new_id = np.cumsum(used) - 1
+        return Packing(new_id[self.assign], self.w, self.loads[used])
+
+
+def first_fit(w: np.array, C: int, sort_dec: bool = True) -> Packing:
+    '''
+    first fit in O(n log n): a segment tree keeps the largest residual capacity of the bins under each node,
+    so the first bin where the item fits is found going down from the root
     w: np.array - list of weights of each item
     C: int - capacity of each bin
     sort_dec: bool - sort the weights in decreasing order
-    return: tuple - (min_bins, bin_assignment)
+    return: Packing - the bin of each item and the loads of the bins
     '''
     n = len(w)
+    w = np.asarray(w)
     # sort the weights in decreasing order
-    if sort_dec:
-        w = np.sort(w)[::-1]
-    bins = [[]]
+    order = np.argsort(w, kind='stable')[::-1] if sort_dec else np.arange(n)
+    assign = np.empty(n, dtype=np.int32)
+    size = 1
+    while size < n + 1:  # the first bin may stay empty
+        size *= 2
+    # tree[size + j] is the residual capacity of bin j (C for the bins not opened yet), tree[p] = max(tree[2p], tree[2p+1])
+    tree = [C] * (2 * size)
     loads = [0]
-    for w_i in w:
-        for j in range(len(bins)):
-            if loads[j] + w_i <= C:
-                bins[j].append(w_i)
-                loads[j] += w_i
+    for i, w_i in zip(order.tolist(), w[order].tolist()):
+        if tree[1] >= w_i:
+            p = 1
+            while p < size:  # go down to the leftmost child where the item fits
+                p *= 2
+                if tree[p] < w_i:
+                    p += 1
+            j = p - size
+        else:  # the item does not fit even in an empty bin
+            j = len(loads)
+        if j == len(loads):
+            loads.append(0)
+        assign[i] = j
+        loads[j] += w_i
+        # update the residual capacity of bin j and its ancestors
+        p = size + j
+        tree[p] = C - loads[j]
+        p //= 2
+        while p:
+            r = max(tree[2*p], tree[2*p + 1])
+            if tree[p] == r:
                 break
-        else:
-            bins.append([w_i])
-            loads.append(w_i)
-    return loads, bins
+            tree[p] = r
+            p //= 2
+    return Packing(assign, w, np.array(loads))
 
 
-def next_fit(w: np.array, C: int) -> tuple:
+def next_fit(w: np.array, C: int) -> Packing:
     '''
     w: np.array - list of weights of each item
     C: int - capacity of each bin
-    return: tuple - (min_bins, bin_assignment)
+    return: Packing - the bin of each item and the loads of the bins
     '''
     n = len(w)
-    bins = [[]]
     loads = [0]
-    for w_i in w:
+    w = np.asarray(w)
+    assign = np.empty(n, dtype=np.int32)
+    for i, w_i in enumerate(w.tolist()):
         if loads[-1] + w_i <= C:
-            bins[-1].append(w_i)
             loads[-1] += w_i
         else:
-            bins.append([w_i])
             loads.append(w_i)
-    return loads, bins
+        assign[i] = len(loads) - 1
+    return Packing(assign, w, np.array(loads))
 
 
-def best_fit(w: np.array, C: int, sort_dec: bool = True) -> tuple:
+def best_fit(w: np.array, C: int, sort_dec: bool = True) -> Packing:
     '''
+    best fit in O(n log n): the open bins are grouped by residual capacity, the distinct residual capacities are
+    kept sorted, so the tightest bin where the item fits is found by bisection
     w: np.array - list of weights of each item
     C: int - capacity of each bin
     sort_dec: bool - sort the weights in decreasing order
-    return: tuple - (min_bins, bin_assignment)
+    return: Packing - the bin of each item and the loads of the bins
     '''
     n = len(w)
+    w = np.asarray(w)
     # sort the weights in decreasing order
-    if sort_dec:
-        w = np.sort(w)[::-1]
-    bins = [[]]
+    order = np.argsort(w, kind='stable')[::-1] if sort_dec else np.arange(n)
+    assign = np.empty(n, dtype=np.int32)
     loads = [0]
-    for w_i in w:
-        best_j = -1
-        best_load = 0
-        for j in range(len(bins)):
-            if loads[j] + w_i <= C and loads[j] + w_i > best_load:
-                best_j = j
-                best_load = loads[j] + w_i
-        if best_j != -1:
-            bins[best_j].append(w_i)
-            loads[best_j] += w_i
+    levels = [C]  # sorted distinct residual capacities of the bins
+    members = {C: [0]}  # heap with the bins of each residual capacity (the first bin is used on ties)
+    for i, w_i in zip(order.tolist(), w[order].tolist()):
+        k = bisect_left(levels, w_i)
+        if k < len(levels):  # tightest bin where the item fits
+            r = levels[k]
+            j = heapq.heappop(members[r])
+            if not members[r]:
+                del members[r]
+                levels.pop(k)
         else:
-            bins.append([w_i])
-            loads.append(w_i)
-    return loads, bins
+            j, r = len(loads), C
+            loads.append(0)
+        assign[i] = j
+        loads[j] += w_i
+        r -= w_i
+        if r in members:
+            heapq.heappush(members[r], j)
+        else:
+            members[r] = [j]
+            insort(levels, r)
+    return Packing(assign, w, np.array(loads))
 
 
-def worst_fit(w: np.array, C: int, sort_dec: bool = True) -> tuple:
+def worst_fit(w: np.array, C: int, sort_dec: bool = True) -> Packing:
     '''
+    worst fit in O(n log n): the bins are kept in a heap by residual capacity, the item goes to the top bin
     w: np.array - list of weights of each item
     C: int - capacity of each bin
     sort_dec: bool - sort the weights in decreasing order
-    return: tuple - (min_bins, bin_assignment)
+    return: Packing - the bin of each item and the loads of the bins
     '''
     n = len(w)
+    w = np.asarray(w)
     # sort the weights in decreasing order
-    if sort_dec:
-        w = np.sort(w)[::-1]
-    bins = [[]]
+    order = np.argsort(w, kind='stable')[::-1] if sort_dec else np.arange(n)
+    assign = np.empty(n, dtype=np.int32)
     loads = [0]
-    for w_i in w:
-        worst_j = -1
-        worst_load = np.inf
-        for j in range(len(bins)):
-            if loads[j] + w_i <= C and loads[j] + w_i < worst_load:
-                worst_j = j
-                worst_load = loads[j] + w_i
-        if worst_j != -1:
-            bins[worst_j].append(w_i)
-            loads[worst_j] += w_i
+    heap = [(-C, 0)]  # (-residual capacity, bin), the first bin is used on ties
+    for i, w_i in zip(order.tolist(), w[order].tolist()):
+        if heap and -heap[0][0] >= w_i:
+            _, j = heapq.heappop(heap)
         else:
-            bins.append([w_i])
-            loads.append(w_i)
-    return loads, bins
+            j = len(loads)
+            loads.append(0)
+        assign[i] = j
+        loads[j] += w_i
+        if loads[j] <= C:
+            heapq.heappush(heap, (loads[j] - C, j))
+    return Packing(assign, w, np.array(loads))
+
+
+def online_fit(stream, C: int, k: int = 4, policy: str = 'next_k'):
+    '''
+    online bin packing of a stream of items, keeping at most k open bins (constant memory): the bins are yielded
+    as soon as they are closed, and the open ones at the end of the stream.
+    'next_k' (Next-k-Fit): the item goes to the first open bin where it fits, else to a new bin, closing the
+    oldest open bin when there are more than k.
+    'harmonic' (Harmonic-k): items in (C/(c+1), C/c] are of class c (class k for items <= C/k), each class has one
+    open bin with c items of its class (class k bins are filled with next fit).
+    stream: iterable of weights, or of chunks of weights (list or np.array)
+    C: int - capacity of each bin
+    k: int - number of open bins (next_k) or of classes (harmonic)
+    policy: str - 'next_k' or 'harmonic'
+    yield: tuple - (load, items) of each bin, where items are the positions of its items in the stream
+    '''
+    if policy not in ('next_k', 'harmonic'):
+        raise ValueError("Unknown policy: " + policy)
+    # open bins: in the order they were opened (next_k) or the bin of each class 1..k (harmonic)
+    n_open = 0 if policy == 'next_k' else k + 1
+    loads = [0] * n_open
+    items = [[] for _ in range(n_open)]
+    pos = 0  # position of the item in the stream
+    for chunk in stream:
+        if isinstance(chunk, np.ndarray):
+            chunk = chunk.tolist()
+        elif not isinstance(chunk, (list, tuple)):
+            chunk = [chunk]
+        for w_i in chunk:
+            if w_i > C:  # the item does not fit in any bin
+                yield w_i, [pos]
+            elif policy == 'next_k':
+                for j in range(len(loads)):
+                    if loads[j] + w_i <= C:
+                        break
+                else:
+                    j = len(loads)
+                    loads.append(0)
+                    items.append([])
+                loads[j] += w_i
+                items[j].append(pos)
+                if loads[j] == C:  # the bin is full
+                    yield loads.pop(j), items.pop(j)
+                elif len(loads) > k:  # close the oldest bin
+                    yield loads.pop(0), items.pop(0)
+            else:
+                c = min(int(C // w_i), k) if w_i > 0 else k  # class of the item
+                if c == k and loads[k] + w_i > C:
+                    yield loads[k], items[k]
+                    loads[k], items[k] = 0, []
+                loads[c] += w_i
+                items[c].append(pos)
+                if c < k and len(items[c]) == c:  # the bin has c items of class c
+                    yield loads[c], items[c]
+                    loads[c], items[c] = 0, []
+            pos += 1
+    # end of the stream, close the open bins
+    for load, its in zip(loads, items):
+        if its:
+            yield load, its
 
 
-def local_search(w: np.array, C: int, sol: list, lb: int = 0) -> tuple:
-    ''' try to improve the solution by local search. The solution is flattened and the items are swapped, best_fit is used to decode the permutation to bins.
+def local_search(w: np.array, C: int, sol: Packing, lb: int = 0) -> Packing:
+    ''' try to improve the solution by local search, moving an item to another bin or swapping two items of different bins.
+    The change of the sum of the squares of the loads is evaluated in O(1) for each candidate (vectorized over all of
+    them): moving x from bin a to bin b changes it by 2x(Lb - La + x), swapping x in bin a with y in bin b by
+    2d(La - Lb + d), where d = y - x. A change is accepted if it empties a bin, else if it increases the sum.
     w: np.array - list of weights of each item
     C: int - capacity of each bin
-    sol: list of list - bin assignment
+    sol: Packing - initial solution (or list of list with the weights in each bin)
     lb: int - lower bound of the number of bins
-    return: tuple - (min_bins, bin_assignment)
+    return: Packing - the improved solution, without empty bins
     '''
-    itens = np.concatenate(sol)  # flatten the solution
-    n_bins = len(sol)  # number of bins
-    loads = [np.sum(bin) for bin in sol]  # loads of each bin
-    sq_sum = np.sum(np.square(loads))  # sum of the square of the loads
+    if isinstance(sol, Packing):
+        itens = np.asarray(w)  # weight of each item
+        bin_of = sol.assign.copy()  # map each item to its bin
+        loads = sol.loads.copy()  # loads of each bin
+    else:
+        itens = np.concatenate(sol)
+        bin_of = np.repeat(np.arange(len(sol)), [len(bin) for bin in sol])
+        loads = np.array([np.sum(bin) for bin in sol], dtype=itens.dtype)
+    n = len(itens)
+    count = np.bincount(bin_of, minlength=len(loads))  # number of items in each bin
+    n_bins = np.count_nonzero(count)  # number of bins
     imp = True  # flag to indicate if the solution was improved
-    # map each item to its bin
-    bin_map = np.empty(len(itens), dtype=int)
-    j = 0
-    for i, bin in enumerate(sol):
-        bin_map[j:j+len(bin)] = i
-        j = i + len(bin)
-    while imp:  # while the solution is improved
+    while imp and n_bins > lb:  # while the solution is improved
         imp = False
-        for i in range(len(itens)-1,-1,-1):
-            if imp:
-                break
-            for j in range(i+1, len(itens)):
-                # skip if the items are in the same bin or are the same item (weights are equal)
-                if bin_map[i] == bin_map[j] or itens[i] == itens[j]:
+        for i in range(n):
+            a, x = bin_of[i], itens[i]
+            La = loads[a]
+            # move item i to the bin b with the largest gain
+            gain = 2 * x * (loads - La + x)
+            gain[(loads + x > C) | (count == 0)] = -1
+            gain[a] = -1
+            b = np.argmax(gain)
+            if gain[b] > 0:
+                bin_of[i] = b
+                loads[a] -= x
+                loads[b] += x
+                count[a] -= 1
+                count[b] += 1
+            else:
+                # swap item i with the item k with the largest gain
+                d = itens - x
+                Lb = loads[bin_of]
+                gain = d * (La - Lb + d)
+                gain[(bin_of == a) | (La + d > C) | (Lb - d > C)] = -1
+                k = np.argmax(gain)
+                if gain[k] <= 0:
                     continue
-                itens[i], itens[j] = itens[j], itens[i]  # swap
-                # decode permutation to bins using best_fit
-                loads, bins = best_fit(itens, C, sort_dec=False)
-                # loads, bins = first_fit(itens, C, sort_dec=False)
-                # loads, bins = worst_fit(itens, C, sort_dec=False)
-                # loads, bins = next_fit(itens, C)
-                new_n_bins = len(loads)  # number of bins
-                if new_n_bins <= n_bins:  # first criteria to accept the new solution
-                    new_sq_sum = np.sum(np.square(loads))  # sum of the square of the loads
-                    if new_n_bins < n_bins or new_sq_sum > sq_sum:  # second criteria to accept the new solution
-                        imp = True
-                        # update the solution
-                        n_bins = new_n_bins
-                        sq_sum = new_sq_sum
-                        sol = bins
-                        # update flatten solution
-                        itens = np.concatenate(sol)
-                        # update map
-                        k = 0
-                        for l, bin in enumerate(sol):
-                            bin_map[k:k+len(bin)] = l
-                            k = l + len(bin)
-                        print('new solution:', n_bins, sq_sum)
-                        # print([int(l) for l in loads])
-                        if n_bins == lb:
-                            return sol
-                        break # break j loop
-                    else:
-                        itens[i], itens[j] = itens[j], itens[i]  # swap back
-                else:
-                    itens[i], itens[j] = itens[j], itens[i]  # swap back
-
-    return sol
+                b = bin_of[k]
+                bin_of[i], bin_of[k] = b, a
+                loads[a] += d[k]
+                loads[b] -= d[k]
+            imp = True
+            if count[a] == 0:  # the move emptied bin a
+                n_bins -= 1
+                print('new solution:', n_bins, np.sum(np.square(loads)))
+                if n_bins == lb:
+                    break
+    return Packing(bin_of, itens, loads).compact()
 
 
 if __name__ == "__main__":
@@ -174,10 +315,11 @@ if __name__ == "__main__":
     while True:
         w = np.random.randint(1, 2*C//3, n)
         # print('input:', w)
-        _, sol = best_fit(w, C)
+        sol = best_fit(w, C)
 
-        lb = int(np.ceil(np.sum(w)/C))
+        lb = l3_bound(w, C)
         if len(sol) > lb:
             print('best_fit_dec:', len(sol), lb)
-            local_search(w, C, sol, lb)
+            sol = local_search(w, C, sol, lb)
+            print('bins of the first items:', sol.assign[:10])
             break
@@ -0,0 +1,169 @@
+import numpy as np
+
+
+def l1_bound(w: np.array, C: int) -> int:
+    '''
+    trivial lower bound of the number of bins: ceil(sum(w) / C)
+    w: np.array - list of weights of each item
+    C: int - capacity of each bin
+    return: int - lower bound
+    '''
+    return int(np.ceil(np.sum(w) / C))
+
+
+def l2_bound(w: np.array, C: int) -> int:
+    '''
+    Martello-Toth L2 lower bound. For a threshold a <= C/2, the items larger than C - a need a bin each, the items in
+    (C/2, C - a] also need a bin each, with room for the items in [a, C/2]; the ones that do not fit need more bins.
+    Only the distinct weights are tested as thresholds, all of them at once with prefix sums.
+    w: np.array - list of weights of each item (at most C)
+    C: int - capacity of each bin
+    return: int - lower bound
+    '''
+    w = np.sort(np.asarray(w))
+    n = len(w)
+    if n == 0:
+        return 0
+    prefix = np.concatenate(([0], np.cumsum(w)))  # prefix[k] is the sum of the k smallest weights
+    half = np.searchsorted(w, C / 2, side='right')  # items <= C/2
+    alpha = np.unique(np.concatenate(([0], w[:half])))
+    big = np.searchsorted(w, C - alpha, side='right')  # items <= C - a
+    small = np.searchsorted(w, alpha, side='left')  # items < a
+    n1 = n - big  # items > C - a
+    n2 = big - half  # items in (C/2, C - a]
+    free = n2 * C - (prefix[big] - prefix[half])  # room left in the bins of the items in (C/2, C - a]
+    s3 = prefix[half] - prefix[small]  # weight of the items in [a, C/2]
+    L = n1 + n2 + np.maximum(0, np.ceil((s3 - free) / C)).astype(int)
+    return max(int(L.max()), l1_bound(w, C))
+
+
+class _Reduction:
+    ''' state of the Martello-Toth reduction: the items sorted by weight (position p is 1..n) and, for the positions
+    of the items not fixed, links to the previous and the next one (with path halving, so a query is near O(1))
+    '''
+
+    def __init__(self, w: np.array, C: int):
+        '''
+        w: np.array - list of weights of each item
+        C: int - capacity of each bin
+        '''
+        self.order = np.argsort(w, kind='stable')  # order[p - 1] is the item at position p
+        s = np.asarray(w)[self.order]
+        self.s = [0] + s.tolist()  # s[p] is the weight of the item at position p
+        self.C = C
+        self.n = n = len(s)
+        self.fits = [0] + np.searchsorted(s, C - s, side='right').tolist()  # last position that fits with p
+        self.left = list(range(n + 2))  # 0 and n + 1 are sentinels, never removed
+        self.right = list(range(n + 2))
+        self.alive = np.ones(n, dtype=bool)  # alive[p - 1]: the item at position p is not fixed
+        self.fixed = []
+
+    def _find(self, link: list, p: int) -> int:
+        ''' first position not removed from p on, following the links '''
+        while link[p] != p:
+            link[p] = link[link[p]]
+            p = link[p]
+        return p
+
+    def remove(self, p: int) -> None:
+        ''' unlink the item at position p '''
+        self.left[p] = p - 1
+        self.right[p] = p + 1
+        self.alive[p - 1] = False
+
+    def smallest(self, skip: int = 0) -> tuple:
+        ''' positions of the two smallest items not removed, other than skip (n + 1 if there are not enough) '''
+        a = self._find(self.right, 1)
+        if a == skip:
+            a = self._find(self.right, a + 1)
+        b = self._find(self.right, min(a + 1, self.n + 1))
+        if b == skip:
+            b = self._find(self.right, b + 1)
+        return a, b
+
+    def try_fix(self, j: int) -> bool:
+        ''' fix the bin of the item at position j if the reduction criterion holds '''
+        s = self.s
+        r = self.C - s[j]  # residual capacity of the bin of j
+        k = self._find(self.left, self.fits[j])  # largest item that fits with j
+        if k == j:
+            k = self._find(self.left, j - 1)
+        if k == 0:
+            self.remove(j)
+            self.fixed.append([j])
+            return True
+        a, b = self.smallest(skip=j)
+        if s[k] == r or b > self.n or s[a] + s[b] > r:
+            self.remove(j)
+            self.remove(k)
+            self.fixed.append([j, k])
+            return True
+        return False
+
+    def reduce(self, j: int = None) -> None:
+        ''' try the items from position j (default: the largest) down to the first one '''
+        j = self._find(self.left, self.n if j is None else j)
+        while j > 0:
+            self.try_fix(j)
+            j = self._find(self.left, j - 1)
+
+    def reduce_large(self) -> None:
+        ''' fix the items, from the largest, that do not fit with the two smallest items (all of them are fixed) '''
+        j = self._find(self.left, self.n)
+        while j > 0:
+            a, b = self.smallest(skip=j)
+            if b <= self.n and self.s[a] + self.s[b] <= self.C - self.s[j]:
+                break
+            self.try_fix(j)
+            j = self._find(self.left, j - 1)
+
+    def bins(self) -> list:
+        ''' fixed bins, each a list of item indices '''
+        return [self.order[np.array(bin) - 1].tolist() for bin in self.fixed]
+
+    def rest(self) -> np.array:
+        ''' indices of the items not fixed, sorted by weight '''
+        return self.order[self.alive]
+
+
+def mtrp_reduce(w: np.array, C: int) -> tuple:
+    '''
+    Martello-Toth reduction for bins of at most two items: for each item j, from the largest, let k be the largest
+    other item that fits with it. The bin {j, k} (or {j} if no item fits) is in some optimal solution if it is full
+    or if no two other items fit together with j, and then it is fixed and its items are removed.
+    The items are sorted once and the ones fixed are unlinked, so it runs in O(n log n).
+    w: np.array - list of weights of each item
+    C: int - capacity of each bin
+    return: tuple - (list of the fixed bins, each a list of item indices; np.array with the indices of the other items)
+    '''
+    red = _Reduction(w, C)
+    red.reduce()
+    return red.bins(), np.sort(red.rest())
+
+
+def l3_bound(w: np.array, C: int, max_iter: int = 100) -> int:
+    '''
+    Martello-Toth L3 lower bound: the reduction fixes some bins, L2 bounds the other items, then the smallest item
+    is removed (a relaxation) and the reduction is tried again, keeping the best bound found. After a removal only
+    the largest items can be fixed (the ones that no longer fit with the two smallest), so the reduction goes on
+    from the state of the previous one, and L2 is computed again only when a removal fixed some bin.
+    w: np.array - list of weights of each item (at most C)
+    C: int - capacity of each bin
+    max_iter: int - maximum number of items removed
+    return: int - lower bound
+    '''
+    w = np.asarray(w)
+    best = l2_bound(w, C)
+    red = _Reduction(w, C)
+    red.reduce()
+    n_fixed = -1  # bins fixed when the bound was computed
+    for _ in range(max_iter):
+        rest = red.rest()
+        if len(red.fixed) > n_fixed:  # with nothing fixed the items are fewer and the bound cannot be higher
+            n_fixed = len(red.fixed)
+            best = max(best, n_fixed + l2_bound(w[rest], C))
+        if len(rest) == 0 or best >= len(red.fixed) + len(rest):  # the bound cannot be raised
+            break
+        red.remove(red.smallest()[0])
+        red.reduce_large()
+    return best
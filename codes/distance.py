@@ -0,0 +1,118 @@
+from collections import OrderedDict
+import math
+import numpy as np
+
+
+class DistanceOracle:
+    ''' Euclidean distances computed on demand from the coordinates, to be used in place of a dense cost matrix.
+    It is indexed like the matrix: c[i, j] (scalars, arrays or slices, with broadcasting), c[i] (row i),
+    len(c) and c.shape, using O(n) memory. Rows are stored with the given dtype and the most recently
+    used ones are kept in a bounded LRU cache. Scalar lookups c[i, j] are computed in double precision.
+    '''
+
+    def __init__(self, points: np.ndarray, dtype=np.float32, cache_rows: int = 0):
+        '''
+        points: np.array - (n, 2) coordinates of the points
+        dtype: type of the rows (float32 halves the memory of the cache)
+        cache_rows: int - maximum number of rows kept in the cache (0 disables the cache)
+        '''
+        self.points = np.asarray(points, dtype=np.float64)
+        self.n = len(self.points)
+        self.shape = (self.n, self.n)
+        self.ndim = 2
+        self.dtype = np.dtype(dtype)
+        self.cache_rows = cache_rows
+        self._cache = OrderedDict()
+        self.hits = self.misses = 0  # cache statistics
+        self._x = self.points[:, 0].tolist()  # for fast scalar lookups
+        self._y = self.points[:, 1].tolist()
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _row(self, i: int) -> np.ndarray:
+        ''' distances from point i to all the points (read-only) '''
+        row = self._cache.get(i)
+        if row is not None:
+            self.hits += 1
+            self._cache.move_to_end(i)
+            return row
+        self.misses += 1
+        d = self.points - self.points[i]
+        row = np.hypot(d[:, 0], d[:, 1]).astype(self.dtype)
+        row.flags.writeable = False  # rows may be shared through the cache
+        if self.cache_rows > 0:
+            self._cache[i] = row
+            if len(self._cache) > self.cache_rows:
+                self._cache.popitem(last=False)  # evict the least recently used row
+        return row
+
+    def _index(self, key) -> np.ndarray:
+        if isinstance(key, slice):
+            return np.arange(self.n)[key]
+        return np.asarray(key)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):  # c[i] is row i, c[[i, j]] are rows i and j
+            if isinstance(key, (int, np.integer)):
+                return self._row(int(key))
+            idx = self._index(key)
+            return self[idx[..., None], np.arange(self.n)]
+        i, j = key
+        if isinstance(i, (int, np.integer)):
+            if isinstance(j, (int, np.integer)):
+                return math.hypot(self._x[i] - self._x[j], self._y[i] - self._y[j])
+            if self.cache_rows > 0 or isinstance(j, slice):
+                return self._row(int(i))[j]
+        i_slice, j_slice = isinstance(i, slice), isinstance(j, slice)
+        i, j = self._index(i), self._index(j)
+        if i_slice:  # as in numpy, slices select whole rows/columns (outer indexing)
+            i = i.reshape((-1,) + (1,) * j.ndim)
+        elif j_slice:
+            i = i[..., None]
+        d = self.points[i] - self.points[j]
+        return np.hypot(d[..., 0], d[..., 1]).astype(self.dtype)
+
+    def argmax(self, block: int = 1024) -> int:
+        ''' flat index of the largest distance, computed by blocks of rows '''
+        best, best_idx = -1.0, 0
+        for start in range(0, self.n, block):
+            rows = self[start:start + block, :]
+            k = int(np.argmax(rows))
+            if rows.flat[k] > best:
+                best = rows.flat[k]
+                best_idx = start * self.n + k
+        return best_idx
+
+
+def distance_matrix(points: np.ndarray, dtype=np.float64, block: int = 1024, out: str = None) -> np.ndarray:
+    ''' Euclidean distance matrix built by blocks of rows, using |a|^2 + |b|^2 - 2ab (a matrix product)
+    instead of the (n, n, 2) broadcast temporary. The extra memory is O(block * n).
+    points: np.array - (n, d) coordinates of the points
+    dtype: type of the matrix, np.float64 or np.float32
+    block: int - number of rows computed at a time
+    out: str - path of a .npy file to be written as a memory map (for matrices larger than the RAM), or None
+    return: np.array - (n, n) distance matrix (a np.memmap if out is given)
+    '''
+    # centering the points reduces the cancellation error of the formula
+    p = np.asarray(points, dtype=np.float64)
+    p = p - p.mean(axis=0)
+    n = len(p)
+    sq = np.einsum('ij,ij->i', p, p)  # |a|^2 of each point
+    if out is None:
+        c = np.empty((n, n), dtype=dtype)
+    else:
+        c = np.lib.format.open_memmap(out, mode='w+', dtype=dtype, shape=(n, n))
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        d2 = p[start:stop] @ p.T  # ab
+        d2 *= -2
+        d2 += sq[start:stop, None]
+        d2 += sq
+        np.maximum(d2, 0, out=d2)  # rounding may give small negative values
+        np.sqrt(d2, out=d2)
+        d2[np.arange(stop - start), np.arange(start, stop)] = 0  # exact zeros on the diagonal
+        c[start:stop] = d2
+    if out is not None:
+        c.flush()
+    return c
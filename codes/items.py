@@ -0,0 +1,47 @@
+import numpy as np
+
+
+class Items:
+    ''' items of the knapsack and bin packing problems as a structure of arrays: item i has weight weights[i]
+    and value values[i]. Slicing returns views of the arrays (no copy), and the solvers return the indices
+    of the items taken instead of the items.
+    '''
+
+    def __init__(self, weights, values=None):
+        '''
+        weights: sequence with the integer weight of each item (not copied if it is already a contiguous int array)
+        values: sequence with the value of each item, int or float (default: no values, as in bin packing)
+        '''
+        weights = np.ascontiguousarray(weights)
+        if not np.issubdtype(weights.dtype, np.integer):
+            if weights.size and not np.array_equal(weights, np.round(weights)):
+                raise ValueError("weights must be integers")
+        self.weights = weights.astype(int, copy=False)
+        self.values = None if values is None else np.ascontiguousarray(values)
+        if self.values is not None and self.values.shape != self.weights.shape:
+            raise ValueError("weights and values must have the same length")
+
+    @classmethod
+    def from_dicts(cls, itens: list) -> 'Items':
+        ''' items from a list of dict with the keys 'w' and 'v' '''
+        return cls([item['w'] for item in itens], [item['v'] for item in itens])
+
+    def to_dicts(self, idx=None) -> list:
+        ''' the items (or the items with indices idx) as a list of dict with the keys 'w' and 'v' '''
+        idx = range(len(self)) if idx is None else idx
+        return [{'w': self.weights[i].item(), 'v': self.values[i].item()} for i in idx]
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def __getitem__(self, idx) -> 'Items':
+        ''' items selected by a slice (a view) or by an array of indices (a copy) '''
+        return Items(self.weights[idx], None if self.values is None else self.values[idx])
+
+    def __repr__(self) -> str:
+        return f"Items(weights={self.weights.tolist()}, values={None if self.values is None else self.values.tolist()})"
+
+
+def as_items(itens) -> Items:
+    ''' the items as an Items, converting a list of dict with the keys 'w' and 'v' '''
+    return itens if isinstance(itens, Items) else Items.from_dicts(itens)
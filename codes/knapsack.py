@@ -1,5 +1,8 @@
+from collections import OrderedDict, namedtuple
+from bisect import bisect_right
 import numpy as np
 import time  # Use time module instead of timeit
+from items import Items, as_items
 
 # Add the timed decorator
 
@@ -14,6 +17,13 @@ def timed(func):
     return wrapper
 
 
+def _result(itens, taken: list) -> list:
+    ''' the items taken, given by their indices: the indices for an Items, the dicts for a list of dict '''
+    if isinstance(itens, Items):
+        return sorted(taken)
+    return [itens[i] for i in sorted(taken, reverse=True)]
+
+
 call_counter = 0
 
 
@@ -49,26 +59,112 @@ def knapsack_rec(itens: list, W: int) -> tuple:
         return (not_taken, value2)
 
 
+MemoStats = namedtuple('MemoStats', ['calls', 'hits', 'evictions', 'memo_size'])
+
+
+def knapsack_memo(itens: list, W: int, max_memo: int = 1 << 22) -> tuple:
+    ''' Solve the knapsack problem using the recursive approach with memoization of the subproblems (i, w): the best
+    value of the items i, i+1, ... with capacity w. The recursion is run on an explicit stack, so there is no
+    recursion limit, and the memo is a LRU dict with at most max_memo entries (evicted values are recomputed).
+    itens: Items, or list of dict with the items, where the dict has the keys 'v' and 'w'.
+    W: int, the maximum weight that the knapsack can carry.
+    max_memo: int, maximum number of subproblems kept in the memo.
+    return: tuple, (list, int, MemoStats) with the items that should be taken (their indices for an Items),
+            the total value and the number of calls, memo hits and evictions and the final size of the memo.
+    '''
+    items = as_items(itens)
+    n = len(items)
+    w = items.weights.tolist()
+    v = items.values.tolist()
+    # min_w[i] is the lightest item from i on, nothing fits with a smaller capacity,
+    # sum_w[i] and sum_v[i] are the total weight and value from i on, everything fits with a larger capacity
+    min_w = [0] * (n + 1)
+    min_w[n] = float('inf')
+    sum_w = [0] * (n + 1)
+    sum_v = [0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        min_w[i] = min(w[i], min_w[i + 1])
+        sum_w[i] = sum_w[i + 1] + w[i]
+        sum_v[i] = sum_v[i + 1] + v[i]
+    memo = OrderedDict()
+    calls = hits = evictions = 0
+
+    def solve(i0: int, c0: int) -> int:
+        ''' best value of the items i0, i0+1, ... with capacity c0 '''
+        nonlocal calls, hits, evictions
+        # a frame is (i, w, stage, value of the branch without item i)
+        stack = [(i0, c0, 0, 0)]
+        ret = 0  # value returned by the last frame finished
+        while stack:
+            i, c, stage, v0 = stack.pop()
+            if stage == 0:  # call
+                calls += 1
+                # anchor cases
+                if c < min_w[i]:  # also when i == n
+                    ret = 0
+                    continue
+                if c >= sum_w[i]:
+                    ret = sum_v[i]
+                    continue
+                key = (i, c)
+                if key in memo:
+                    hits += 1
+                    memo.move_to_end(key)
+                    ret = memo[key]
+                    continue
+                # solve assuming the item is not taken
+                stack.append((i, c, 1, 0))
+                stack.append((i + 1, c, 0, 0))
+                continue
+            if stage == 1 and w[i] <= c:  # ret is the value without item i, solve assuming it is taken
+                stack.append((i, c, 2, ret))
+                stack.append((i + 1, c - w[i], 0, 0))
+                continue
+            if stage == 2:  # ret is the value with item i
+                ret = max(v0, ret + v[i])
+            memo[(i, c)] = ret
+            if len(memo) > max_memo:
+                memo.popitem(last=False)  # evict the least recently used subproblem
+                evictions += 1
+        return ret
+
+    value = solve(0, W)
+    # build the list of items taken: item i is taken if it fits and taking it is better, as in the forward pass
+    taken = []
+    c = W
+    for i in range(n):
+        if c < min_w[i]:
+            break
+        if w[i] <= c and solve(i + 1, c) < v[i] + solve(i + 1, c - w[i]):
+            taken.append(i)
+            c -= w[i]
+    return _result(itens, taken), value, MemoStats(calls, hits, evictions, len(memo))
+
+
 @timed
 def knapsack_pd(itens: list, W: int) -> tuple:
     ''' Solve the knapsack problem using dynamic programming approach.
-    itens: list of dict with the items, where the dict has the keys 'v' and 'w'.
+    itens: Items, or list of dict with the items, where the dict has the keys 'v' and 'w'.
     W: int, the maximum weight that the knapsack can carry.
-    return: tuple, (list, int) where the list contains the items that should be taken and the int is the total value.
+    return: tuple, (list, int) where the list contains the items that should be taken
+            (their indices for an Items) and the int is the total value.
     '''
-    n = len(itens)  # number of itens
+    items = as_items(itens)
+    weights = items.weights.tolist()
+    values = items.values.tolist()
+    n = len(items)  # number of itens
     M = [[0 for _ in range(W+1)] for _ in range(n+1)]  # matrix to store the values
 
     # fill first row with trivial case
-    w0 = itens[0]['w']
-    v0 = itens[0]['v']
+    w0 = weights[0]
+    v0 = values[0]
     for w in range(w0, W+1):
         M[0][w] = v0
 
     # fill the rest of the matrix using the recursive formula M[i][w] = max(M[i-1][w], M[i-1][w-wi] + vi)
     for i in range(1, n):
-        wi = itens[i]['w']  # weight of the item
-        vi = itens[i]['v']  # value of the item
+        wi = weights[i]  # weight of the item
+        vi = values[i]  # value of the item
         M[i][:wi] = M[i-1][:wi]  # best value for weight w < wi is the same as the previous row
         for w in range(wi, W+1):
             M[i][w] = max(M[i-1][w], M[i-1][w-wi] + vi)
@@ -78,34 +174,111 @@ def knapsack_pd(itens: list, W: int) -> tuple:
     w = W
     while i > 0:
         if M[i][w] != M[i-1][w]:
-            taken.append(itens[i])
-            w -= itens[i]['w']
+            taken.append(i)
+            w -= weights[i]
         i -= 1
     if M[i][w] != 0:
-        taken.append(itens[i])
-    return taken, M[n-1][W]
+        taken.append(i)
+    return _result(itens, taken), M[n-1][W]
+
+
+def _dp_values(weights: np.ndarray, values: np.ndarray, W: int) -> np.ndarray:
+    ''' best values of the knapsack for every capacity 0..W, keeping only one row of the matrix.
+    weights, values: np.array with the weights and values of the items.
+    W: int, the maximum weight that the knapsack can carry.
+    return: np.array, M[w] is the best value with capacity w.
+    '''
+    M = np.zeros(W + 1, dtype=values.dtype)
+    for wi, vi in zip(weights.tolist(), values.tolist()):
+        if wi <= W:
+            # M[w] = max(M[w], M[w-wi] + vi), the right side is evaluated before the update
+            np.maximum(M[wi:], M[:W + 1 - wi] + vi, out=M[wi:])
+    return M
+
+
+def _dp_packed(weights: np.ndarray, values: np.ndarray, W: int) -> tuple:
+    ''' knapsack dynamic programming storing the decisions bit-packed, 8 decisions per byte.
+    weights, values: np.array with the weights and values of the items.
+    W: int, the maximum weight that the knapsack can carry.
+    return: tuple, (list, int) with the indices of the items taken and the total value.
+    '''
+    n = len(weights)
+    M = np.zeros(W + 1, dtype=values.dtype)
+    keep = np.zeros((n, (W + 8) // 8), dtype=np.uint8)  # bit w of keep[i]: item i is taken with capacity w
+    for i, (wi, vi) in enumerate(zip(weights.tolist(), values.tolist())):
+        if wi <= W:
+            M_shifted = M[:W + 1 - wi] + vi
+            take = M_shifted > M[wi:]
+            keep[i] = np.packbits(np.concatenate((np.zeros(wi, dtype=bool), take)))
+            M[wi:][take] = M_shifted[take]
+    # Reconstruct the list of items taken
+    w = W
+    taken = []
+    for i in range(n - 1, -1, -1):
+        if keep[i, w >> 3] >> (7 - (w & 7)) & 1:
+            taken.append(i)
+            w -= weights[i]
+    return taken, M[W]
+
+
+def _dp_divide(weights: np.ndarray, values: np.ndarray, W: int, idx: np.ndarray, taken: list,
+               max_bits: int = 1 << 24) -> None:
+    ''' Hirschberg-style divide and conquer reconstruction: the items are split in two halves, the best values
+    of each half are computed for every capacity with one row of memory, and the capacity W is split where
+    the sum of both halves is the best. Small subproblems are solved with the bit-packed decisions.
+    weights, values: np.array with the weights and values of all the items.
+    W: int, the capacity of the subproblem.
+    idx: np.array with the indices of the items of the subproblem.
+    taken: list where the indices of the items taken are appended.
+    max_bits: int, largest decision table (in bits) solved directly.
+    '''
+    if len(idx) == 0:
+        return
+    if len(idx) == 1 or len(idx) * (W + 1) <= max_bits:
+        sub_taken, _ = _dp_packed(weights[idx], values[idx], W)
+        taken.extend(idx[sub_taken].tolist())
+        return
+    mid = len(idx) // 2
+    first = _dp_values(weights[idx[:mid]], values[idx[:mid]], W)
+    second = _dp_values(weights[idx[mid:]], values[idx[mid:]], W)
+    w1 = int(np.argmax(first + second[::-1]))  # first[w1] + second[W - w1] is the optimum
+    _dp_divide(weights, values, w1, idx[:mid], taken, max_bits)
+    _dp_divide(weights, values, W - w1, idx[mid:], taken, max_bits)
 
 
 @timed
-def knapsack_pd_numpy(itens: list, W: int) -> tuple:
+def knapsack_pd_numpy(itens: list, W: int, mode: str = 'bool') -> tuple:
     ''' Solve the knapsack problem using dynamic programming approach, using numpy vectorized operations.
-    itens: list of dict with the items, where the dict has the keys 'v' and 'w'.
+    itens: Items, or list of dict with the items, where the dict has the keys 'v' and 'w'.
     W: int, the maximum weight that the knapsack can carry.
-    return: tuple, (list, int) where the list contains the items that should be taken and the int is the total value.
+    mode: str, how the decisions are kept for the reconstruction: 'bool' (n x (W+1) bool matrix),
+          'packed' (bit-packed matrix, 8 times smaller) or 'hirschberg' (divide and conquer, O(W) memory,
+          recomputing the values of the halves of the problem).
+    return: tuple, (list, int) where the list contains the items that should be taken
+            (their indices for an Items) and the int is the total value.
     '''
-    n = len(itens)
-    M = np.zeros(W + 1, dtype=int)
+    items = as_items(itens)
+    weights, values = items.weights, items.values
+    if mode in ('packed', 'hirschberg'):
+        if mode == 'packed':
+            taken, value = _dp_packed(weights, values, W)
+        else:
+            taken = []
+            _dp_divide(weights, values, W, np.arange(len(items)), taken)
+            value = values[taken].sum()
+        return _result(itens, taken), value
+    elif mode != 'bool':
+        raise ValueError("Unknown mode: " + mode)
+    n = len(items)
+    M = np.zeros(W + 1, dtype=values.dtype)
     keep = np.zeros((n, W + 1), dtype=bool)
-    M_shifted = np.zeros(W + 1, dtype=int)
-
-    for i in range(n):
-        wi = itens[i]['w']
-        vi = itens[i]['v']
+    M_shifted = np.zeros(W + 1, dtype=values.dtype)
 
+    for i, (wi, vi) in enumerate(zip(weights.tolist(), values.tolist())):
         if wi <= W:
             M_shifted[:] = 0
             # Shift the M array to the right by wi positions and add vi
-            M_shifted[wi:] = M[:-wi] + vi
+            M_shifted[wi:] = M[:W + 1 - wi] + vi
 
             # Determine whether including the current item offers a better value
             new_M = np.maximum(M, M_shifted)
@@ -119,22 +292,435 @@ def knapsack_pd_numpy(itens: list, W: int) -> tuple:
     taken = []
     for i in range(n - 1, -1, -1):
         if keep[i, w]:
-            taken.append(itens[i])
-            w -= itens[i]['w']
+            taken.append(i)
+            w -= weights[i]
+
+    return _result(itens, taken), M[W]
+
+
+def knapsack_bounded(itens: list, W: int, counts) -> tuple:
+    ''' Solve the bounded knapsack problem, where item i has counts[i] copies, with the bit-packed dynamic
+    programming. The copies are split in binary pieces of 1, 2, 4, ... copies (and the rest), so any number of
+    copies from 0 to counts[i] is a sum of pieces and item i becomes O(log counts[i]) 0/1 items.
+    itens: Items, or list of dict with the items, where the dict has the keys 'v' and 'w'.
+    W: int, the maximum weight that the knapsack can carry.
+    counts: sequence with the number of copies of each item.
+    return: tuple, (np.array, int) with the number of copies taken of each item and the total value.
+    '''
+    items = as_items(itens)
+    counts = np.asarray(counts, dtype=int)
+    counts = np.where(items.weights > 0, np.minimum(counts, W // np.maximum(items.weights, 1)), counts)  # no useless copies
+    # pieces 1, 2, ..., 2^(p-1) of item i, where 2^p - 1 <= counts[i], and a piece with the rest
+    counts = np.maximum(counts, 0)
+    p = np.floor(np.log2(counts + 1)).astype(int)
+    rest = counts - ((1 << p) - 1)
+    n_pieces = p + (rest > 0)
+    owner = np.repeat(np.arange(len(items)), n_pieces)
+    k = np.arange(len(owner)) - np.repeat(np.cumsum(n_pieces) - n_pieces, n_pieces)  # index of the piece in its item
+    size = 1 << k
+    has_rest = k == p[owner]
+    size[has_rest] = rest[owner[has_rest]]
+    taken, value = _dp_packed(items.weights[owner] * size, items.values[owner] * size, W)
+    copies = np.zeros(len(items), dtype=int)
+    np.add.at(copies, owner[taken], size[taken])
+    return copies, value
 
-    return taken, M[W]
 
-# Example
+def knapsack_multiple_choice(itens: list, W: int, classes) -> tuple:
+    ''' Solve the multiple-choice knapsack problem: the items are partitioned in classes and at most one item
+    of each class can be taken. The dynamic programming processes one class at a time: each item of the class
+    is a vectorized update from the values before the class, and the decisions are bit-packed.
+    itens: Items, or list of dict with the items, where the dict has the keys 'v' and 'w'.
+    W: int, the maximum weight that the knapsack can carry.
+    classes: sequence with the class of each item.
+    return: tuple, (list, int) where the list contains the items that should be taken
+            (their indices for an Items) and the int is the total value.
+    '''
+    items = as_items(itens)
+    weights, values = items.weights, items.values
+    # the items sorted by class, and where each class starts
+    order = np.argsort(np.asarray(classes), kind='stable')
+    start = np.flatnonzero(np.r_[True, np.diff(np.asarray(classes)[order]) != 0, True])
+    M = np.zeros(W + 1, dtype=values.dtype)
+    keep = np.zeros((len(items), (W + 8) // 8), dtype=np.uint8)  # bit w of keep[i]: item i is taken with capacity w
+    for a, b in zip(start[:-1].tolist(), start[1:].tolist()):
+        best = M.copy()
+        choice = np.full(W + 1, -1)  # item of the class taken with each capacity
+        for i in order[a:b].tolist():
+            wi = int(weights[i])
+            if wi <= W:
+                M_shifted = M[:W + 1 - wi] + values[i]
+                take = M_shifted > best[wi:]
+                best[wi:][take] = M_shifted[take]
+                choice[wi:][take] = i
+        for i in order[a:b].tolist():
+            keep[i] = np.packbits(choice == i)
+        M = best
+    # Reconstruct the list of items taken, one class at a time
+    w = W
+    taken = []
+    for a, b in zip(start[-2::-1].tolist(), start[:0:-1].tolist()):
+        for i in order[a:b].tolist():
+            if keep[i, w >> 3] >> (7 - (w & 7)) & 1:
+                taken.append(i)
+                w -= weights[i]
+                break
+    return _result(itens, taken), M[W]
+
+
+def knapsack_all_capacities(itens: list, W: int) -> np.ndarray:
+    ''' Best value of the knapsack for every capacity 0..W, from a single pass of the dynamic programming.
+    itens: Items, or list of dict with the items, where the dict has the keys 'v' and 'w'.
+    W: int, the largest capacity.
+    return: np.array, the element w is the best value with capacity w.
+    '''
+    items = as_items(itens)
+    weights, values = items.weights, items.values
+    return _dp_values(weights, values, W)
+
+
+def knapsack_batch(weights: np.ndarray, values: np.ndarray, W) -> tuple:
+    ''' Solve a batch of independent knapsack problems with one dynamic programming over a (k, W+1) matrix,
+    so the loop over the items is shared by the k instances. Instances with less items can be padded with
+    zero-value items. The decisions are bit-packed and the solutions are reconstructed for all instances at once.
+    weights, values: np.array (k, n) with the weights (int) and values (int or float) of the items of each instance.
+    W: int or np.array (k,) with the capacity of each instance.
+    return: tuple, (np.array (k, n) of bool with the items taken, np.array (k,) with the total values).
+    '''
+    weights = np.asarray(weights, dtype=int)
+    values = np.asarray(values)
+    k, n = weights.shape
+    caps = np.broadcast_to(np.asarray(W, dtype=int), (k,))
+    W = int(caps.max())
+    # the rows of M are stored after a margin of -inf (capacities below 0) of max weight columns,
+    # so M[:, w - wi] is a gather from the flat array without bounds checks
+    margin = int(np.clip(weights, 0, W + 1).max(initial=0))
+    stride = margin + W + 1
+    low = np.iinfo(values.dtype).min // 2 if np.issubdtype(values.dtype, np.integer) else -np.inf
+    flat = np.full(k * stride, low, dtype=values.dtype)
+    M = flat.reshape(k, stride)[:, margin:]
+    M[:] = 0
+    base = (np.arange(k) * stride + margin)[:, None] + np.arange(W + 1)  # flat index of M[:, w]
+    keep = np.zeros((k, n, (W + 8) // 8), dtype=np.uint8)  # bit w of keep[:, i]: item i is taken with capacity w
+    for i in range(n):
+        # M_shifted[:, w] = M[:, w - wi] + vi
+        M_shifted = flat.take(base - np.minimum(weights[:, i, None], W + 1)) + values[:, i, None]
+        take = M_shifted > M
+        keep[:, i] = np.packbits(take, axis=1)
+        np.maximum(M, M_shifted, out=M)
+    # Reconstruct the items taken, all instances together
+    w = caps.copy()
+    taken = np.zeros((k, n), dtype=bool)
+    inst = np.arange(k)
+    for i in range(n - 1, -1, -1):
+        taken[:, i] = keep[inst, i, w >> 3] >> (7 - (w & 7)) & 1
+        w -= taken[:, i] * weights[:, i]
+    return taken, M[inst, caps]
+
+
+def _pareto(weights: np.ndarray, values: np.ndarray, W: int, max_states: int = None) -> tuple:
+    ''' Nemhauser-Ullmann dynamic programming: only the non-dominated (weight, value) states are kept, in arrays
+    sorted by weight with strictly increasing values. The time depends on the number of states, not on W.
+    weights, values: np.array with the weights and values of the items.
+    W: int, the maximum weight that the knapsack can carry.
+    max_states: int, give up when there are more states than this (None: no limit).
+    return: tuple, (list, int) with the indices of the items taken and the total value, or None if it gave up.
+    '''
+    sw = np.zeros(1, dtype=int)  # weights of the states
+    sv = np.zeros(1, dtype=values.dtype)  # values of the states
+    parents = []  # for each item: the previous state of each state and whether the item was taken
+    for wi, vi in zip(weights.tolist(), values.tolist()):
+        fit = np.flatnonzero(sw <= W - wi)  # states that can take the item
+        if len(fit) == 0:
+            parents.append(None)
+            continue
+        # merge the states without and with the item
+        cw = np.concatenate((sw, sw[fit] + wi))
+        cv = np.concatenate((sv, sv[fit] + vi))
+        src = np.concatenate((np.arange(len(sw)), fit))
+        took = np.concatenate((np.zeros(len(sw), dtype=bool), np.ones(len(fit), dtype=bool)))
+        order = np.lexsort((-cv, cw))  # by weight, the best value first
+        cw, cv, src, took = cw[order], cv[order], src[order], took[order]
+        # a state is dominated if a state not heavier has at least the same value
+        keep = np.empty(len(cv), dtype=bool)
+        keep[0] = True
+        keep[1:] = cv[1:] > np.maximum.accumulate(cv)[:-1]
+        sw, sv = cw[keep], cv[keep]
+        parents.append((src[keep], took[keep]))
+        if max_states is not None and len(sw) > max_states:
+            return None
+    # the heaviest state has the best value
+    k = len(sw) - 1
+    value = sv[k]
+    taken = []
+    for i in range(len(parents) - 1, -1, -1):
+        if parents[i] is not None:
+            src, took = parents[i]
+            if took[k]:
+                taken.append(i)
+            k = src[k]
+    return taken, value
+
+
+def _pareto_break(weights: np.ndarray, values: np.ndarray, W: int, b: int, z, max_states: int = None) -> tuple:
+    ''' Nemhauser-Ullmann dynamic programming started from the break solution (items 0..b-1 taken): the items are
+    flipped alternately from the break item outwards, adding the ones after it and removing the ones before it
+    (as in Pisinger's minknap). Besides the dominated states, the states whose Dantzig bound (the next item to add
+    fills the residual capacity, the next item to remove takes the excess out) is below z are dropped, so only the
+    states near the capacity survive, even on the instances that are hard for the branch and bound.
+    weights, values: np.array with the weights and values of the items, sorted by decreasing value density.
+    W: int, the maximum weight that the knapsack can carry.
+    b: int, the break item (the first that does not fit in the greedy solution).
+    z: value of a known solution.
+    max_states: int, give up when there are more states than this (None: no limit).
+    return: tuple, (list, int) with the indices of the items taken and the total value, or None if it gave up.
+    '''
+    n = len(weights)
+    w, p = weights.tolist(), values.tolist()
+    sw = np.array([int(weights[:b].sum())])  # weights of the states
+    sv = np.array([values[:b].sum()])  # values of the states
+    tol = 1e-9 * max(1, abs(z))  # rounding of the bounds
+    parents = []  # for each item: the item, the previous state of each state and whether the item was flipped
+    i, j = b - 1, b  # next item to remove and to add
+    while i >= 0 or j < n:
+        if j < n and (i < 0 or j - b <= b - 1 - i):
+            k, wk, vk = j, w[j], p[j]
+            j += 1
+        else:
+            k, wk, vk = i, -w[i], -p[i]
+            i -= 1
+        # merge the states without and with the item flipped
+        m = len(sw)
+        order = np.argsort(np.concatenate((sw, sw + wk)), kind='stable')  # merge of two sorted runs
+        flip = order >= m
+        src = order - m * flip
+        cw = sw[src] + wk * flip
+        cv = sv[src] + vk * flip
+        # a state is dominated if a state not heavier has at least the same value
+        keep = np.empty(len(cv), dtype=bool)
+        keep[0] = True
+        keep[1:] = cv[1:] > np.maximum.accumulate(cv)[:-1]
+        keep[:-1] &= (cw[1:] != cw[:-1]) | (cv[1:] <= cv[:-1])  # of two states with the same weight, the best
+        fit = cw <= W
+        z = max(z, cv[keep & fit].max(initial=z))
+        ub = cv + (W - cw) * (p[j] / w[j] if j < n else 0.0)
+        ub[~fit] = cv[~fit] - (cw[~fit] - W) * (p[i] / w[i] if i >= 0 else np.inf)
+        keep &= ub >= z - tol
+        sw, sv = cw[keep], cv[keep]
+        parents.append((k, src[keep], flip[keep]))
+        if max_states is not None and len(sw) > max_states:
+            return None
+    fit = np.flatnonzero(sw <= W)
+    s = fit[np.argmax(sv[fit])]  # the best state
+    value = sv[s]
+    taken = np.zeros(n, dtype=bool)
+    taken[:b] = True
+    for k, src, flip in reversed(parents):
+        if flip[s]:
+            taken[k] = not taken[k]
+        s = src[s]
+    return np.flatnonzero(taken).tolist(), value
+
+
+@timed
+def knapsack_pareto(itens: list, W: int) -> tuple:
+    ''' Solve the knapsack problem using the sparse (Pareto frontier) dynamic programming, for huge capacities.
+    itens: Items, or list of dict with the items, where the dict has the keys 'v' and 'w'.
+    W: int, the maximum weight that the knapsack can carry.
+    return: tuple, (list, int) where the list contains the items that should be taken
+            (their indices for an Items) and the int is the total value.
+    '''
+    items = as_items(itens)
+    weights, values = items.weights, items.values
+    taken, value = _pareto(weights, values, W)
+    return _result(itens, taken), value
+
+
+@timed
+def knapsack(itens: list, W: int, max_dense: int = 1 << 33) -> tuple:
+    ''' Solve the knapsack problem choosing between the dense (bit-packed) and the sparse (Pareto) dynamic programming.
+    After i items the sparse engine has at most min(2^i, W+1) states, and it is cheaper while it has less
+    than about W/8 states (the dense engine updates W+1 values per item, but faster). The sparse engine is
+    tried when this bound allows it and abandoned for the dense one if the states grow past W/8.
+    itens: Items, or list of dict with the items, where the dict has the keys 'v' and 'w'.
+    W: int, the maximum weight that the knapsack can carry.
+    max_dense: int, largest n*(W+1) decision table (in bits) solved with the dense engine.
+    return: tuple, (list, int) where the list contains the items that should be taken
+            (their indices for an Items) and the int is the total value.
+    '''
+    items = as_items(itens)
+    weights, values = items.weights, items.values
+    n = len(items)
+    result = None
+    if n * (W + 1) > max_dense or n < 63 and 2**n <= W // 8:  # the dense engine is too large or too slow
+        result = _pareto(weights, values, W)
+    elif n * (W + 1) > 1 << 20:  # small problems go straight to the dense engine
+        result = _pareto(weights, values, W, max_states=W // 8)
+    if result is None:
+        result = _dp_packed(weights, values, W)
+    taken, value = result
+    return _result(itens, taken), value
+
+
+def _branch_and_bound(w: list, p: list, C: int, z: int, integral: bool = True, max_nodes: int = None) -> tuple:
+    ''' Horowitz-Sahni depth-first branch and bound, without recursion. The items must be sorted by decreasing
+    value density; each forward move takes the longest run of items that fit and the Dantzig (fractional)
+    bound of a node is computed in O(log n) from prefix sums.
+    w, p: list with the weights and values of the items.
+    C: int, the capacity.
+    z: value of a known solution, only better solutions are searched.
+    integral: bool, the values are integers (the bound can be rounded down).
+    max_nodes: int, maximum number of nodes (forward moves and backtracks) searched (default: no limit).
+    return: tuple, (list, int, bool) with the indices of the items of the best solution found (None if none is better
+            than z), its value and False if the search was stopped by max_nodes (the solution may not be optimal).
+    '''
+    m = len(w)
+    PW = [0] * (m + 1)  # prefix sums of the weights and values
+    PV = [0] * (m + 1)
+    for k in range(m):
+        PW[k + 1] = PW[k] + w[k]
+        PV[k + 1] = PV[k] + p[k]
+    gap = 1 if integral else 1e-9  # smallest improvement of the value
+    best = None
+    stack = []  # items taken in the current node
+    i, c, v = 0, C, 0  # next item, residual capacity and value of the current node
+    nodes = 0
+    while True:
+        nodes += 1
+        if max_nodes is not None and nodes > max_nodes:
+            return best, z, False
+        if i < m:
+            k = bisect_right(PW, PW[i] + c) - 1  # items i..k-1 fit, item k does not
+            ub = v + PV[k] - PV[i]
+            if k < m:
+                ub += (c - PW[k] + PW[i]) * p[k] / w[k]
+            if ub >= z + gap:  # forward move: take items i..k-1 and skip item k
+                stack.extend(range(i, k))
+                c -= PW[k] - PW[i]
+                v += PV[k] - PV[i]
+                i = k + 1
+                continue
+        elif v >= z + gap:  # leaf with a better solution
+            z, best = v, list(stack)
+        # backtrack: the last item taken is left out
+        if not stack:
+            return best, z, True
+        j = stack.pop()
+        c += w[j]
+        v -= p[j]
+        i = j + 1
+
+
+def _knapsack_core(weights: np.ndarray, values: np.ndarray, W: int, core: int = 50, max_nodes: int = 2 * 10**5,
+                   max_dense: int = 1 << 33) -> tuple:
+    ''' exact knapsack with an expanding core: the items are sorted by value density, the ones far before the break
+    item (the first that does not fit in the greedy solution) are fixed in the knapsack and the ones far after it
+    are fixed out. The core problem is solved by branch and bound, and the core is expanded while some fixed item
+    could improve the solution (Dembo-Hammer bound of the flipped item above the best value).
+    The core doubles on each side with open items, so a hard core does not jump at once to all the items.
+    The branch and bound may take exponential time (e.g. strongly correlated instances, with values = weights + k):
+    after max_nodes nodes the whole problem is solved with the Pareto dynamic programming from the break solution
+    instead, which keeps only the states near the capacity (or with the dense one, divide and conquer when its table
+    has more than max_dense bits, if there are too many states).
+    weights, values: np.array with the weights and values of the items.
+    W: int, the maximum weight that the knapsack can carry.
+    core: int, initial number of items of the core on each side of the break item.
+    max_nodes: int, maximum number of nodes of the branch and bound of a core.
+    max_dense: int, largest decision table (in bits) of the dense dynamic programming solved directly.
+    return: tuple, (list, int) with the indices of the items taken and the total value.
+    '''
+    integral = np.issubdtype(values.dtype, np.integer)
+    gap = 1 if integral else 1e-9
+    # items without weight are always taken, too heavy or worthless items never are
+    free = np.flatnonzero((weights <= 0) & (values > 0))
+    idx = np.flatnonzero((weights > 0) & (weights <= W) & (values > 0))
+    idx = idx[np.argsort(-values[idx] / weights[idx], kind='stable')]
+    w, p = weights[idx], values[idx]
+    n = len(idx)
+    PW = np.concatenate(([0], np.cumsum(w)))
+    PV = np.concatenate(([0], np.cumsum(p)))
+    b = int(np.searchsorted(PW, W, side='right')) - 1  # break item
+    if b >= n:  # everything fits
+        return free.tolist() + idx.tolist(), values[free].sum() + PV[n]
+    r = p[b] / w[b]  # density of the break item
+    U = PV[b] + (W - PW[b]) * r  # Dantzig bound
+    # bound of the problem with item j flipped with respect to the greedy solution
+    U_flip = U - np.abs(p - w * r)
+    lo, hi = max(b - core, 0), min(b + core + 1, n)  # the core is the items lo..hi-1
+    z, taken = (PV[b] - PV[lo]).item(), list(range(lo, b))  # greedy solution in the core
+    while True:
+        C = W - int(PW[lo])  # capacity of the core
+        sub, z, done = _branch_and_bound(w[lo:hi].tolist(), p[lo:hi].tolist(), C, z, integral, max_nodes)
+        if not done:  # too many nodes, solve all the items with the dynamic programming from the break solution
+            result = _pareto_break(w, p, W, b, (PV[lo] + z).item(), max_states=W // 8)
+            if result is None:  # too many states, dense dynamic programming (divide and conquer if too large)
+                taken = []
+                _dp_divide(w, p, W, np.arange(n), taken, max_dense)
+                result = taken, p[taken].sum()
+            taken, z_total = result
+            return free.tolist() + idx[taken].tolist(), values[free].sum() + z_total
+        if sub is not None:
+            taken = [lo + k for k in sub]
+        z_total = PV[lo] + z
+        # fixed items whose flip could give a better solution
+        open_ = np.flatnonzero(U_flip >= z_total + gap)
+        open_ = open_[(open_ < lo) | (open_ >= hi)]
+        if len(open_) == 0:
+            break
+        # double the core towards the open items, at most up to the farthest one
+        size = hi - lo
+        new_lo = max(min(lo, int(open_.min())), lo - size)
+        new_hi = min(max(hi, int(open_.max()) + 1), hi + size)
+        z += (PV[lo] - PV[new_lo]).item()  # the items lo_new..lo-1 are in the known solution
+        taken = list(range(new_lo, lo)) + taken
+        lo, hi = new_lo, new_hi
+    taken = list(range(lo)) + taken
+    return free.tolist() + idx[taken].tolist(), values[free].sum() + z_total
+
+
+@timed
+def knapsack_bb(itens: list, W: int, core: int = 50, max_nodes: int = 2 * 10**5) -> tuple:
+    ''' Solve the knapsack problem using branch and bound over an expanding core of the items (see _knapsack_core),
+    without the W+1 table of the dynamic programming (used only for the cores where the search takes too long).
+    itens: Items, or list of dict with the items, where the dict has the keys 'v' and 'w'.
+    W: int, the maximum weight that the knapsack can carry.
+    core: int, initial number of items of the core on each side of the break item.
+    max_nodes: int, maximum number of nodes of the branch and bound of a core before the dynamic programming is used.
+    return: tuple, (list, int) where the list contains the items that should be taken
+            (their indices for an Items) and the int is the total value.
+    '''
+    items = as_items(itens)
+    weights, values = items.weights, items.values
+    taken, value = _knapsack_core(weights, values, W, core, max_nodes)
+    return _result(itens, taken), value
 
 
-n = 100
-W = 100
-max_w = 50
-min_w = 5
-max_v = 100
-min_v = 1
-itens = [{'w': np.random.randint(min_w, max_w), 'v': np.random.randint(min_v, max_v)} for _ in range(n)]
+if __name__ == "__main__":
+    # Example
+    n = 100
+    W = 100
+    max_w = 50
+    min_w = 5
+    max_v = 100
+    min_v = 1
+    itens = [{'w': np.random.randint(min_w, max_w), 'v': np.random.randint(min_v, max_v)} for _ in range(n)]
 
-print(knapsack_pd(itens, W)[1])
-print(knapsack_pd_numpy(itens, W)[1])
-# print(knapsack_rec_timed(itens, W)[1])
+    print(knapsack_pd(itens, W)[1])
+    print(knapsack_pd_numpy(itens, W)[1])
+    print(knapsack_pd_numpy(itens, W, mode='packed')[1])
+    print(knapsack_pd_numpy(Items.from_dicts(itens), W, mode='packed'))  # indices of the items taken
+    print(knapsack_pd_numpy(itens, W, mode='hirschberg')[1])
+    print(knapsack_pareto(itens, W)[1])
+    print(knapsack(itens, W)[1])
+    print(knapsack_bb(itens, W)[1])
+    taken, value, stats = knapsack_memo(itens, W)
+    print(value, stats)
+    print(knapsack_all_capacities(itens, W)[::10])
+    print(knapsack_bounded(itens, W, np.random.randint(1, 5, n))[1])
+    print(knapsack_multiple_choice(itens, W, np.arange(n) % 10)[1])
+    # a batch of 1000 small instances
+    weights = np.random.randint(min_w, max_w, (1000, 20))
+    values = np.random.randint(min_v, max_v, (1000, 20))
+    taken, batch_values = knapsack_batch(weights, values, W)
+    print(batch_values[:10])
+    # print(knapsack_rec_timed(itens, W)[1])
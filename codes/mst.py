@@ -3,7 +3,7 @@ import numpy as np
 
 def Kruskal(c:np.ndarray, edges:list = None) -> list:
     '''
-    c: np.array - cost matrix
+    c: np.array - cost matrix (or a DistanceOracle)
     edges: list - list of edges (i,j), if None, complete graph is considered
     return: list - list of arcs in the solution
     '''
@@ -33,7 +33,7 @@ def Kruskal(c:np.ndarray, edges:list = None) -> list:
 
 def Prim(c:np.ndarray,edges:list = None)->list:
     '''
-    c: np.array - cost matrix
+    c: np.array - cost matrix (or a DistanceOracle)
     edges: list - list of edges (i,j), if None, complete graph is considered
     return: list - list of arcs in the solution
     '''
@@ -45,7 +45,7 @@ def Prim(c:np.ndarray,edges:list = None)->list:
         c = c_
         
     closest_in_tree = np.zeros(n, dtype=int)
-    min_dist = c[0]
+    min_dist = np.array(c[0], dtype=float) # copy, min_dist is updated in place
     non_tree = set(range(1, n))
     arcs = []
     while non_tree: # while non_tree is not empty
@@ -1,16 +1,49 @@
-from pyscipopt import Model
+from pyscipopt import LP, Model
 from pyscipopt import quicksum as qsum
 import numpy as np
+import time
+from bpp import Packing, best_fit
+from items import Items
+from knapsack import knapsack_bounded
+from bpp_bounds import l3_bound, mtrp_reduce
 
 
-def bpp(n: int, m: int, w: np.array, C: int) -> tuple:
+def _model_info(model: Model, info: dict) -> None:
+    ''' store the size of the model and the solving time in info (if it is not None) '''
+    if info is not None:
+        info['vars'] = model.getNVars(transformed=False)
+        info['conss'] = model.getNConss(transformed=False)
+        info['time'] = model.getSolvingTime()
+
+
+def _group(w: np.array) -> tuple:
+    ''' distinct weights in decreasing order, and the indices of the items of each weight '''
+    order = np.argsort(w, kind='stable')[::-1]
+    types, start = np.unique(-w[order], return_index=True)
+    return -types, np.split(order, start[1:])
+
+
+def bpp(n: int, m: int, w: np.array, C: int, lb: int = 0, reduce: bool = True, info: dict = None) -> Packing:
     '''
     n: int - number of items
     m: int - number of bins
     w: list - list of weights of each item
     C: int - capacity of each bin
-    return: tuple - (min_bins, bin_assignment)
+    lb: int - lower bound of the number of bins (e.g. bpp_bounds.l3_bound), added as a constraint
+    reduce: bool - fix the bins of the Martello-Toth reduction (bpp_bounds.mtrp_reduce) and solve the model
+                   only for the other items
+    info: dict - if given, receives the number of variables and constraints of the model and the solving time
+    return: Packing - the bin of each item and the loads of the bins (bins numbered from 0, without empty bins)
     '''
+    w_all = np.asarray(w)
+    fixed, items = mtrp_reduce(w_all, C) if reduce else ([], np.arange(n))
+    assign = np.empty(n, dtype=int)
+    for j, f in enumerate(fixed):
+        assign[f] = j
+    if len(items) == 0:
+        return Packing(assign, w_all).compact()
+    # model of the items not fixed, with the bins left
+    n, m, w = len(items), min(m - len(fixed), len(items)), w_all[items]
     model = Model("bpp")
     #x = {(i, j): model.addVar(vtype="B") for i in range(n) for j in range(m)}
     x = {}
@@ -30,11 +63,13 @@ def bpp(n: int, m: int, w: np.array, C: int) -> tuple:
         model.addCons(qsum(x[i, j] for j in range(m)) == 1)
     for j in range(m):
         model.addCons(qsum(w[i]*x[i, j] for i in range(n)) <= C*y[j])
+    if lb > len(fixed):
+        model.addCons(qsum(y) >= lb - len(fixed))
     # remove verbose
     model.hideOutput()
     # optimize
     model.optimize()
-    min_bins = model.getObjVal()
+    _model_info(model, info)
     # compact implementation
     # bin_assignment = np.array([next(j for j in range(m) if model.getVal(x[i, j]) > 0.5) for i in range(n)])
     # verbose implementation
@@ -44,7 +79,245 @@ def bpp(n: int, m: int, w: np.array, C: int) -> tuple:
             if model.getVal(x[i, j]) > 0.5:
                 bin_assignment.append(j)
                 break
-    return min_bins, bin_assignment
+    assign[items] = len(fixed) + np.array(bin_assignment)
+    return Packing(assign, w_all).compact()
+
+
+def bpp_compact(w: np.array, C: int, lb: int = 0, info: dict = None) -> Packing:
+    '''
+    assignment model over the distinct weights: x[k, j] is the number of items of weight type k in bin j, the number
+    of bins m is the best_fit solution and the bins are used in order (y[j] >= y[j+1]) to break the symmetry
+    w: list - list of weights of each item
+    C: int - capacity of each bin
+    lb: int - lower bound of the number of bins, added as a constraint
+    info: dict - if given, receives the number of variables and constraints of the model and the solving time
+    return: Packing - the bin of each item and the loads of the bins
+    '''
+    w = np.asarray(w)
+    types, members = _group(w)
+    d = [len(idx) for idx in members]  # number of items of each type
+    K = len(types)
+    m = len(best_fit(w, C).compact())
+    model = Model("bpp_compact")
+    x = {(k, j): model.addVar(vtype="I", lb=0, ub=d[k]) for k in range(K) for j in range(m)}
+    y = [model.addVar(vtype="B") for j in range(m)]
+    model.setObjective(qsum(y), "minimize")
+    for k in range(K):
+        model.addCons(qsum(x[k, j] for j in range(m)) == d[k])
+    for j in range(m):
+        model.addCons(qsum(int(types[k])*x[k, j] for k in range(K)) <= C*y[j])
+    for j in range(m - 1):
+        model.addCons(y[j] >= y[j + 1])
+    if lb > 0:
+        model.addCons(qsum(y) >= lb)
+    model.hideOutput()
+    model.optimize()
+    _model_info(model, info)
+    # give the items of each type to the bins
+    assign = np.empty(len(w), dtype=int)
+    for k in range(K):
+        p = 0
+        for j in range(m):
+            c = int(round(model.getVal(x[k, j])))
+            assign[members[k][p:p + c]] = j
+            p += c
+    return Packing(assign, w).compact()
+
+
+def bpp_arcflow(w: np.array, C: int, lb: int = 0, info: dict = None) -> Packing:
+    '''
+    arc-flow model (Valerio de Carvalho): a bin is a path from node 0 to node C, with an arc (a, a + w_k) for each
+    item of weight type k and loss arcs (a, C). The arcs of type k start only at the nodes reachable with the heavier
+    types and at most d_k items of type k, and the number of bins is the flow z from node 0 to node C, at most the
+    best_fit solution.
+    The size of the model depends on C and on the number of distinct weights, not on the number of items.
+    w: list - list of weights of each item
+    C: int - capacity of each bin
+    lb: int - lower bound of the number of bins, added as a constraint
+    info: dict - if given, receives the number of variables and constraints of the model and the solving time
+    return: Packing - the bin of each item and the loads of the bins
+    '''
+    w = np.asarray(w)
+    types, members = _group(w)
+    d = [len(idx) for idx in members]  # number of items of each type
+    # item arcs (a, a + w_k, k), built from the nodes reachable with the heavier types
+    reach = np.zeros(C + 1, dtype=bool)
+    reach[0] = True
+    arcs = []
+    for k, wk in enumerate(types.tolist()):
+        if wk > C:
+            raise ValueError("Item heavier than the bin capacity")
+        for _ in range(min(d[k], C // max(wk, 1))):
+            new = reach.copy()
+            new[wk:] |= reach[:C + 1 - wk]
+            if (new == reach).all():
+                break
+            reach = new
+        arcs.extend((a, a + wk, k) for a in np.flatnonzero(reach[:C + 1 - wk]).tolist())
+    # loss arcs (a, C)
+    arcs.extend((a, C, -1) for a in np.flatnonzero(reach[:C]).tolist() if a > 0)
+    model = Model("bpp_arcflow")
+    f = [model.addVar(vtype="I", lb=0, ub=d[k] if k >= 0 else None) for (u, v, k) in arcs]
+    z = model.addVar(vtype="I", lb=0, ub=len(best_fit(w, C).compact()))  # number of bins
+    model.setObjective(z, "minimize")
+    out_arcs = {}
+    in_arcs = {}
+    for a, (u, v, k) in enumerate(arcs):
+        out_arcs.setdefault(u, []).append(a)
+        in_arcs.setdefault(v, []).append(a)
+    for v in set(out_arcs) | set(in_arcs):
+        balance = qsum(f[a] for a in in_arcs.get(v, [])) - qsum(f[a] for a in out_arcs.get(v, []))
+        if v == 0:
+            model.addCons(balance == -z)
+        elif v == C:
+            model.addCons(balance == z)
+        else:
+            model.addCons(balance == 0)
+    by_type = {}
+    for a, (u, v, k) in enumerate(arcs):
+        if k >= 0:
+            by_type.setdefault(k, []).append(a)
+    for k in range(len(types)):
+        model.addCons(qsum(f[a] for a in by_type[k]) >= d[k])
+    if lb > 0:
+        model.addCons(z >= lb)
+    model.hideOutput()
+    model.optimize()
+    _model_info(model, info)
+    # decompose the flow in paths from 0 to C, each path is a bin
+    flow = [int(round(model.getVal(var))) for var in f]
+    left = [list(idx) for idx in members]  # items of each type not packed yet
+    assign = np.empty(len(w), dtype=int)
+    for j in range(int(round(model.getVal(z)))):
+        u = 0
+        while u != C:
+            a = next(a for a in out_arcs[u] if flow[a] > 0)
+            flow[a] -= 1
+            u, k = arcs[a][1], arcs[a][2]
+            if k >= 0 and left[k]:  # the flow may cover more items than there are
+                assign[left[k].pop()] = j
+    return Packing(assign, w).compact()
+
+
+def _price(lp: LP, types: np.array, demand: np.array, C: int, scale: int, columns: list, max_iter: int,
+           lb: int = 0, alpha: float = 0.8) -> int:
+    '''
+    column generation: solve the master LP, price a pattern with the bounded knapsack over the duals (scaled to
+    integers) and add it while its reduced cost is negative. Each solve starts from the basis of the last one.
+    The duals are smoothed (Wentges) towards the duals with the best Lagrangian bound d.pi / v, where v is the
+    value of the best pattern, and the column generation stops as soon as this bound rounds up to the same
+    number of bins as the master (or as the lower bound lb).
+    lp: LP - master LP, a row for each weight type and a column for each pattern
+    types: np.array - weight of each type
+    demand: np.array - number of items of each type to cover (the lhs of the rows)
+    C: int - capacity of each bin
+    scale: int - the duals are multiplied by scale and truncated to give the values of the knapsack
+    columns: list - the patterns of the columns of lp, the new ones are appended
+    max_iter: int - maximum number of columns added
+    lb: int - lower bound of the number of bins
+    alpha: float - weight of the best duals in the smoothing (0 for no smoothing)
+    return: int - lower bound of the number of bins
+    '''
+    slack = (C // max(int(types[-1]), 1) + 1) / scale  # the truncation of the duals may hide this much value
+    bound, center = lb, None  # best Lagrangian bound and its duals
+    z = lp.solve()
+    for _ in range(max_iter):
+        pi = np.maximum(lp.getDual(), 0)
+        smooth = pi if center is None else alpha * center + (1 - alpha) * pi
+        while True:
+            pos = np.flatnonzero(smooth > 0)  # the items without value are not in the best patterns
+            copies = np.zeros(len(types), dtype=int)
+            copies[pos], _ = knapsack_bounded(Items(types[pos], (smooth[pos] * scale).astype(int)), C, demand[pos])
+            v = smooth @ copies
+            L = demand @ smooth / max(v + slack, 1)
+            if L > bound:
+                bound, center = L, smooth
+            if pi @ copies > 1 + 1e-9 or smooth is pi:
+                break
+            smooth = pi  # the pattern does not improve the master, price the duals of the master
+        if pi @ copies <= 1 + 1e-9 or np.ceil(bound - 1e-6) >= np.ceil(z - 1e-6):  # optimal or no gain
+            break
+        k = np.flatnonzero(copies)
+        lp.addCol(list(zip(k.tolist(), copies[k].astype(float).tolist())), obj=1.0)
+        columns.append(copies)
+        z = lp.solve()
+    return int(np.ceil(bound - 1e-6))
+
+
+def bpp_colgen(w: np.array, C: int, lb: int = 0, info: dict = None, scale: int = 10**9,
+               max_iter: int = 10000) -> Packing:
+    '''
+    Gilmore-Gomory column generation: the master is the LP relaxation of the set covering model over the patterns
+    (number of items of each weight type in a bin), starting with the patterns of the best_fit solution, and the
+    pricing is a bounded knapsack (knapsack.knapsack_bounded) with the duals as values. The integer solution is
+    found by a dive: the patterns with value at least 1 in the LP (or the largest one) are fixed, the demands are
+    decreased and the column generation continues from the last basis. After each step the items left are packed
+    with best_fit, and the dive stops when it can not beat the best solution found.
+    w: list - list of weights of each item
+    C: int - capacity of each bin
+    lb: int - lower bound of the number of bins
+    info: dict - if given, receives the number of columns and rows of the master, the LP bound and the solving time
+    scale: int - precision of the duals in the pricing
+    max_iter: int - maximum number of columns added in each column generation
+    return: Packing - the bin of each item and the loads of the bins
+    '''
+    start = time.time()
+    w = np.asarray(w)
+    types, members = _group(w)
+    demand = np.array([len(idx) for idx in members])
+    type_of = np.empty(len(w), dtype=int)  # weight type of each item
+    for k, idx in enumerate(members):
+        type_of[idx] = k
+    lp = LP("bpp_colgen", sense="minimize")
+    for d in demand.tolist():
+        lp.addRow([], lhs=float(d), rhs=None)
+    columns = []  # patterns of the columns
+    for pattern in {tuple(np.bincount(type_of[idx], minlength=len(types)).tolist()) for idx in best_fit(w, C).items}:
+        pattern = np.array(pattern)
+        k = np.flatnonzero(pattern)
+        lp.addCol(list(zip(k.tolist(), pattern[k].astype(float).tolist())), obj=1.0)
+        columns.append(pattern)
+    bound = _price(lp, types, demand, C, scale, columns, max_iter, lb)
+    res_bound = bound  # lower bound of the number of bins of the items left
+    chosen = []  # patterns of the bins fixed by the dive
+    residual = demand.copy()  # items of each type not packed by the dive
+    best = (None, len(w) + 1)  # (patterns fixed, number of bins) of the best solution
+    while True:
+        # pack the items left with best_fit
+        n_bins = len(chosen) + len(best_fit(np.repeat(types, residual), C).compact())
+        if n_bins < best[1]:
+            best = (list(chosen), n_bins)
+        if best[1] <= bound or not residual.any() or len(chosen) + res_bound >= best[1]:
+            break
+        x = np.array(lp.getPrimal())
+        fix = np.flatnonzero(x >= 1 - 1e-6)
+        times = np.floor(x[fix] + 1e-6).astype(int)
+        if len(fix) == 0:
+            fix, times = [int(np.argmax(x))], [1]
+        for p, t in zip(fix, times):
+            for _ in range(t):
+                pattern = np.minimum(columns[p], residual)
+                if pattern.any():
+                    chosen.append(pattern)
+                    residual -= pattern
+        for k, d in enumerate(residual.tolist()):
+            lp.chgSide(k, float(d), lp.infinity())
+        res_bound = _price(lp, types, residual, C, scale, columns, max_iter)
+    if info is not None:
+        info['vars'] = lp.ncols()
+        info['conss'] = lp.nrows()
+        info['lp_bound'] = bound
+        info['time'] = time.time() - start
+    # give the items of each type to the bins of the patterns, and the other items to the best_fit bins
+    left = [list(idx) for idx in members]
+    assign = np.empty(len(w), dtype=int)
+    for j, pattern in enumerate(best[0]):
+        for k in np.flatnonzero(pattern).tolist():
+            for _ in range(pattern[k]):
+                assign[left[k].pop()] = j
+    rest = np.array([i for idx in left for i in idx], dtype=int)
+    assign[rest] = len(best[0]) + best_fit(w[rest], C).assign
+    return Packing(assign, w).compact()
 
 
 if __name__ == "__main__":
@@ -53,8 +326,14 @@ if __name__ == "__main__":
     C = 100
     w = np.random.randint(1, 2*C//3, n)
     print("Weights:", w)
-    min_bins, bin_assignment = bpp(n, m, w, C)
-    print("Min Bins:", min_bins)
-    print("Bin Assignment:", bin_assignment)
-    print("Bins load:", np.bincount(bin_assignment, weights=w))
-    print("Bins list:", {int(i): list(filter(lambda x: bin_assignment[x] == i, range(n))) for i in np.unique(bin_assignment)})
+    lb = l3_bound(w, C)
+    print("Lower bound:", lb)
+    packing = bpp(n, m, w, C, lb)
+    print("Min Bins:", len(packing))
+    print("Bin Assignment:", packing.assign)
+    print("Bins load:", packing.loads)
+    print("Bins list:", {j: idx.tolist() for j, idx in enumerate(packing.items)})
+    for f in (bpp_compact, bpp_arcflow, bpp_colgen):
+        info = {}
+        packing = f(w, C, lb, info=info)
+        print(f"{f.__name__}: {len(packing)} bins, {info['vars']} vars, {info['conss']} conss, {info['time']:.3f} s")
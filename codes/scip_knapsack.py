@@ -1,13 +1,16 @@
 from pyscipopt import Model 
 from pyscipopt import quicksum as qsum
+from items import Items
 
-def knapsack(C:int,profits:list,weights:list)->tuple:
+def knapsack(C:int,profits,weights:list=None)->tuple:
     '''
     C: int - capacity of the knapsack
-    profits: list - list of profits of each item
-    weights: list - list of weights of each item
+    profits: list - list of profits of each item, or an Items with the weights and profits (values)
+    weights: list - list of weights of each item (not used with an Items)
     return: tuple - (max_profit, items)
     '''
+    if isinstance(profits, Items):
+        profits, weights = profits.values.tolist(), profits.weights.tolist()
     n = len(profits)
     model = Model("knapsack")
     x = [model.addVar(vtype="B") for i in range(n)]
@@ -1,6 +1,7 @@
 from pyscipopt import Model
 from pyscipopt import quicksum as qsum
 import numpy as np
+from distance import distance_matrix
 import random
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
@@ -16,8 +17,8 @@ def make_random_instance(n: int = 10, min_degree: int = 2, max_degree: int = 5,
     '''
     points = np.random.rand(n, 2)  # random points
     edges = {}
-    # Precompute the distance matrix (copilot made it, don't you ask me how it does it)
-    D = np.linalg.norm(points[:, np.newaxis, :] - points[np.newaxis, :, :], axis=2)
+    # Precompute the distance matrix
+    D = distance_matrix(points)
     np.fill_diagonal(D, np.inf)
     for i in range(n):
         n_neighbors = np.random.randint(min_degree, max_degree)
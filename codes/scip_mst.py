@@ -4,6 +4,7 @@ from pyscipopt import quicksum as qsum
 import numpy as np
 import matplotlib.pyplot as plt
 from itertools import combinations as comb
+from distance import DistanceOracle, distance_matrix
 
 
 def mst_all_circles(c: np.array) -> tuple:
@@ -35,15 +36,18 @@ def mst_all_circles(c: np.array) -> tuple:
     return min_cost, arcs
 
 
-def make_random_instance(n: int = 10) -> tuple:
+def make_random_instance(n: int = 10, lazy: bool = False) -> tuple:
     '''
     n: int - number of points
+    lazy: bool - if True, c is a DistanceOracle computing the distances on demand instead of a dense matrix
     return: tuple - (points: np.array, c: np.array)
     '''
     # list of random points
     points = np.random.rand(n, 2)
+    if lazy:
+        return points, DistanceOracle(points)
     # cost matrix with Euclidean distance
-    c = np.linalg.norm(points[:, None] - points, axis=-1)
+    c = distance_matrix(points)
     return points, c
 
 
@@ -4,6 +4,7 @@ from pyscipopt import quicksum as qsum
 import numpy as np
 import matplotlib.pyplot as plt
 from itertools import combinations as comb
+from distance import DistanceOracle, distance_matrix
 
 
 def tsp_mtz(c: np.array) -> tuple:
@@ -188,19 +189,21 @@ def plot_tours(points: np.array, tours: list):
 plot_tours.fig_ax = plt.subplots()  # create 'static' figure and axis for plot_tours function
 
 
-def make_random_instance(n: int = 10) -> tuple:
+def make_random_instance(n: int = 10, matrix: bool = True, lazy: bool = False) -> tuple:
     '''
     n: int - number of points
+    matrix: bool - if False, the cost matrix is not built (c is None), for large instances solved from the points only
+    lazy: bool - if True, c is a DistanceOracle computing the distances on demand instead of a dense matrix
     return: tuple - (points: np.array, c: np.array)
     '''
     # list of random points
     points = np.random.rand(n, 2)
+    if not matrix:
+        return points, None
+    if lazy:
+        return points, DistanceOracle(points)
     # cost matrix with Euclidean distance
-    c = np.zeros((n, n))
-    # for i in range(n):
-    #     for j in range(n):
-    #         c[i, j] = np.linalg.norm(points[i] - points[j])
-    c = np.linalg.norm(points[:, None] - points, axis=-1)
+    c = distance_matrix(points)
     return points, c
 
 
@@ -1,3 +1,4 @@
+import heapq
 import numpy as np
 
 def make_random_instance(itens: int = 10, n_sets: int = 5, min_item_repetitions: int = 1, max_item_repetitions: int = 3) -> tuple:
@@ -21,54 +22,80 @@ def make_random_instance(itens: int = 10, n_sets: int = 5, min_item_repetitions:
 
 
 
-def greedy(sets: list,partial:list =None) -> tuple:
+def _greedy_cover(sets: list, partial: list = None, rcl: int = 1) -> list:
     '''
+    greedy set cover with incremental scores: the score of a set is the sum of 1/count[i] over its items not
+    covered yet, where count[i] is the number of sets with item i. An inverted index item -> sets gives the sets
+    whose score drops when an item is covered, and a lazy max-heap gives the best set (an entry is updated
+    only when it reaches the top with an old score), so each item is covered once in O(count[i]).
     sets: list - list of subsets of {0,1,...,n-1}
-    return: list - selected sets indices
+    partial: list - sets already selected (the list is extended)
+    rcl: int - the set is chosen among the rcl best, with probability proportional to the score (1 for the best)
+    return: list - selected sets
     '''
-    # n_sets = len(sets)
-    # print("Number of sets:", n_sets)
-    # # remove empty sets
-    # sets = [s for s in sets if s]
-    # # remove dominated sets
-    # sets = [s for i, s in enumerate(sets) if not any(s < sets[j] for j in range(len(sets)) if i != j)]
-    n_sets = len(sets)
-    # print("Number of sets after removing dominated sets:", n_sets)
-    itens = set.union(*sets)
+    # inverted index: sets of each item
+    index = {}
+    for j, s in enumerate(sets):
+        for i in s:
+            index.setdefault(i, []).append(j)
+    itens = set(index)  # items not covered yet
     selected_sets = []
     if partial:
         itens -= set.union(*partial)
         selected_sets = partial
-    itens_count = {i: sum(1 for j in sets if i in j) for i in itens}
-    scores = [sum(1/itens_count[i] for i in (s & itens)) for s in sets]
+    weight = {i: 1 / len(js) for i, js in index.items()}
+    scores = [sum(weight[i] for i in s if i in itens) for s in sets]
+    left = [sum(1 for i in s if i in itens) for s in sets]  # number of items not covered of each set
+    # heap of (-score, set), the scores are rounded so the ties (up to the rounding errors) go to the first set
+    key = lambda j: (-round(scores[j], 10), j)
+    heap = [key(j) for j in range(len(sets)) if left[j]]
+    heapq.heapify(heap)
     while itens:
-        best_set = np.argmax(scores)
+        # the rcl best sets, updating the entries with old scores
+        best = []
+        while heap and len(best) < rcl:
+            entry = heapq.heappop(heap)
+            j = entry[1]
+            if not left[j]:
+                continue
+            if entry != key(j):
+                heapq.heappush(heap, key(j))
+            else:
+                best.append(j)
+        if len(best) > 1:
+            weights = np.array([scores[j] for j in best])
+            best_set = np.random.choice(best, p=weights / sum(weights))
+        else:
+            best_set = best[0]
+        for j in best:
+            if j != best_set:
+                heapq.heappush(heap, key(j))
         selected_sets.append(sets[best_set])
-        itens -= sets[best_set]
-        scores = [sum(1/itens_count[i] for i in (s & itens)) for s in sets]
+        # cover the new items, decreasing the scores of their sets
+        for i in sets[best_set] & itens:
+            itens.remove(i)
+            for j in index[i]:
+                scores[j] -= weight[i]
+                left[j] -= 1
     return selected_sets
 
-def greedy_randomized(sets: list) -> tuple:
+
+def greedy(sets: list, partial: list = None) -> list:
     '''
     sets: list - list of subsets of {0,1,...,n-1}
-    return: list - selected sets indices
+    partial: list - sets already selected (the list is extended)
+    return: list - selected sets
     '''
-    def select(scores: list) -> int:
-        idx = np.argsort(scores)[-2:]
-        weights = np.array([scores[i] for i in idx])
-        return np.random.choice(idx, p=weights/sum(weights))
-    
-    n_sets = len(sets)
-    itens = set.union(*sets)
-    selected_sets = []
-    itens_count = {i: sum(1 for j in sets if i in j) for i in itens}
-    scores = [sum(1/itens_count[i] for i in s) for s in sets]
-    while itens:
-        best_set = select(scores)
-        selected_sets.append(sets[best_set])
-        itens -= sets[best_set]
-        scores = [sum(1/itens_count[i] for i in (s & itens)) for s in sets]
-    return selected_sets
+    return _greedy_cover(sets, partial)
+
+
+def greedy_randomized(sets: list) -> list:
+    '''
+    sets: list - list of subsets of {0,1,...,n-1}
+    return: list - selected sets, each one chosen among the two best
+    '''
+    return _greedy_cover(sets, rcl=2)
+
 
 def LNS(sets: list, solution:list, max_iter: int = 20, k:int=3) -> list:
     '''
@@ -0,0 +1,216 @@
+import numpy as np
+
+
+def knn_points(points: np.ndarray, k: int = 10) -> np.ndarray:
+    '''
+    find the k nearest neighbors of each point using a uniform grid, without building the n x n matrix
+    points: np.array - (n, 2) coordinates of the points
+    k: int - number of neighbors of each point
+    return: np.array - (n, k) indices of the neighbors, sorted by increasing distance
+    '''
+    n = len(points)
+    k = min(k, n - 1)
+    # grid with about 3 points per cell
+    g = max(1, int(np.sqrt(n / 3)))
+    lo = points.min(axis=0)
+    h = max(float((points.max(axis=0) - lo).max()), 1e-12) / g  # cell size
+    cell = np.minimum(((points - lo) / h).astype(np.int64), g - 1)
+    cid = cell[:, 0] * g + cell[:, 1]  # cells are numbered column by column
+    order = np.argsort(cid, kind='stable')  # points sorted by cell
+    start = np.searchsorted(cid[order], np.arange(g * g + 1))  # first point of each cell in order
+    neighbors = np.empty((n, k), dtype=np.int32)
+    for cx in range(g):
+        for cy in range(g):
+            members = order[start[cx * g + cy]:start[cx * g + cy + 1]]
+            if len(members) == 0:
+                continue
+            r = 1  # radius (in cells) of the search window
+            while True:
+                ylo, yhi = max(cy - r, 0), min(cy + r, g - 1)
+                # the cells of a grid column are contiguous in order
+                cand = np.concatenate([order[start[x * g + ylo]:start[x * g + yhi + 1]]
+                                       for x in range(max(cx - r, 0), min(cx + r, g - 1) + 1)])
+                if len(cand) > k:
+                    d = np.linalg.norm(points[members, None] - points[cand], axis=-1)
+                    d[members[:, None] == cand] = np.inf  # a point is not its own neighbor
+                    idx = np.argpartition(d, k - 1, axis=1)[:, :k]
+                    rows = np.arange(len(members))[:, None]
+                    idx = idx[rows, np.argsort(d[rows, idx], axis=1)]
+                    # every point closer than r*h is inside the window, so the answer is exact
+                    if d[rows, idx[:, -1:]].max() <= r * h or r >= g:
+                        neighbors[members] = cand[idx]
+                        break
+                r += 1
+    return neighbors
+
+
+class GridIndex:
+    ''' uniform grid over a set of points, answering nearest point queries and supporting deletion '''
+
+    def __init__(self, points: np.ndarray, subset: np.ndarray = None, per_cell: int = 2):
+        '''
+        points: np.array - (n, 2) coordinates of the points
+        subset: np.array - indices of the points to be indexed (default: all)
+        per_cell: int - average number of points per cell
+        '''
+        if subset is None:
+            subset = np.arange(len(points))
+        self.x = points[:, 0].tolist()
+        self.y = points[:, 1].tolist()
+        self.g = g = max(1, int(np.sqrt(len(subset) / per_cell)))
+        self.lo = lo = points.min(axis=0)
+        self.h = max(float((points.max(axis=0) - lo).max()), 1e-12) / g  # cell size
+        cell = np.minimum(((points[subset] - lo) / self.h).astype(np.int64), g - 1)
+        self.cells = [[] for _ in range(g * g)]  # cells[cx*g + cy] lists the points in the cell
+        for i, cx, cy in zip(subset.tolist(), cell[:, 0].tolist(), cell[:, 1].tolist()):
+            self.cells[cx * g + cy].append(i)
+        self.cell_of = dict(zip(subset.tolist(), (cell[:, 0] * g + cell[:, 1]).tolist()))
+        self.count = len(subset)  # number of points in the index
+
+    def __len__(self) -> int:
+        return self.count
+
+    def remove(self, i: int) -> None:
+        ''' remove point i from the index '''
+        self.cells[self.cell_of.pop(i)].remove(i)
+        self.count -= 1
+
+    def nearest(self, i: int) -> int:
+        ''' nearest indexed point to point i (which may or may not be indexed itself, it is never returned)
+        return: index of the nearest point, or -1 if the index is empty
+        '''
+        x, y, g, cells = self.x, self.y, self.g, self.cells
+        xi, yi = x[i], y[i]
+        cx = min(max(int((xi - self.lo[0]) / self.h), 0), g - 1)
+        cy = min(max(int((yi - self.lo[1]) / self.h), 0), g - 1)
+        best, best_d = -1, np.inf
+        for r in range(g):
+            if (2*r + 1)**2 > 4 * self.count + 64:  # few points left, scan them all
+                for j in self.cell_of:
+                    d = (x[j] - xi)**2 + (y[j] - yi)**2
+                    if d < best_d and j != i:
+                        best, best_d = j, d
+                return best
+            # cells in the ring at distance r from (cx, cy)
+            for gx in range(max(cx - r, 0), min(cx + r, g - 1) + 1):
+                step = 1 if abs(gx - cx) == r else 2 * r  # inner columns: only top and bottom cells
+                for gy in range(cy - r, cy + r + 1, max(step, 1)):
+                    if 0 <= gy < g:
+                        for j in cells[gx * g + gy]:
+                            d = (x[j] - xi)**2 + (y[j] - yi)**2
+                            if d < best_d and j != i:
+                                best, best_d = j, d
+            # every point closer than r*h is inside the window already scanned
+            if best >= 0 and best_d <= (r * self.h)**2:
+                return best
+        return best
+
+
+def nearest_neighbor_points(points: np.ndarray, start: int = 0) -> list:
+    ''' find a tour using the nearest neighbor heuristic, from the coordinates only (no cost matrix)
+    points: np.array - (n, 2) coordinates of the cities
+    start: int - first city of the tour
+    return: list - the tour
+    '''
+    grid = GridIndex(points)
+    grid.remove(start)
+    tour = [start]
+    while len(grid):
+        nxt = grid.nearest(tour[-1])
+        grid.remove(nxt)
+        tour.append(nxt)
+    return tour
+
+
+def greedy_edge_points(points: np.ndarray, k: int = 10) -> list:
+    ''' find a tour using the greedy edge heuristic over the k nearest neighbors candidate edges,
+    from the coordinates only (no cost matrix). The shortest candidate edges are added while they 
+    do not create a city of degree 3 or a subtour; the resulting paths are joined by nearest endpoints.
+    points: np.array - (n, 2) coordinates of the cities
+    k: int - number of neighbors of each city
+    return: list - the tour
+    '''
+    n = len(points)
+    if n < 3:
+        return list(range(n))
+    neighbors = knn_points(points, k)
+    # candidate edges (i, j) with i < j, sorted by length
+    i = np.repeat(np.arange(n), neighbors.shape[1])
+    j = neighbors.ravel()
+    i, j = np.minimum(i, j), np.maximum(i, j)
+    edges = np.unique(i.astype(np.int64) * n + j)
+    i, j = edges // n, edges % n
+    length = np.linalg.norm(points[i] - points[j], axis=1)
+    order = np.argsort(length, kind='stable')
+    # add the edges with a union-find structure
+    parent = list(range(n))
+
+    def find(u):
+        while parent[u] != u:
+            parent[u] = parent[parent[u]]
+            u = parent[u]
+        return u
+
+    adj = [[] for _ in range(n)]
+    for u, v in zip(i[order].tolist(), j[order].tolist()):
+        if len(adj[u]) < 2 and len(adj[v]) < 2:
+            pu, pv = find(u), find(v)
+            if pu != pv:
+                parent[pu] = pv
+                adj[u].append(v)
+                adj[v].append(u)
+    # join the paths: walk a path to its other end, then jump to the nearest endpoint of another path
+    ends = np.array([u for u in range(n) if len(adj[u]) < 2])
+    grid = GridIndex(points, ends)
+    tour = []
+    u = int(ends[0])
+    while True:
+        grid.remove(u)
+        prev = -1
+        while True:  # walk the path starting at u
+            tour.append(u)
+            nxt = next((v for v in adj[u] if v != prev), -1)
+            if nxt < 0:
+                break
+            prev, u = u, nxt
+        if prev >= 0:  # the other end of a path with more than one city
+            grid.remove(u)
+        if not len(grid):
+            break
+        u = grid.nearest(u)
+    return tour
+
+
+def hilbert_index(points: np.ndarray, order: int = 16) -> np.ndarray:
+    ''' position of each point along a Hilbert curve covering the bounding box of the points
+    points: np.array - (n, 2) coordinates of the points
+    order: int - the curve has 2^order x 2^order cells
+    return: np.array - index of each point along the curve
+    '''
+    side = 1 << order
+    lo = points.min(axis=0)
+    span = max(float((points.max(axis=0) - lo).max()), 1e-12)
+    xy = np.minimum(((points - lo) / span * side).astype(np.int64), side - 1)
+    x, y = xy[:, 0].copy(), xy[:, 1].copy()
+    d = np.zeros(len(points), dtype=np.int64)
+    s = side >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # rotate the quadrant
+        flip = ~ry & rx
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        swap = ~ry
+        x, y = np.where(swap, y, x), np.where(swap, x, y)
+        s >>= 1
+    return d
+
+
+def space_filling_curve(points: np.ndarray) -> list:
+    ''' find a tour visiting the cities in the order of a Hilbert curve, in O(n log n)
+    points: np.array - (n, 2) coordinates of the cities
+    return: list - the tour
+    '''
+    return np.argsort(hilbert_index(points), kind='stable').tolist()
@@ -0,0 +1,113 @@
+import numpy as np
+
+
+class Tour:
+    ''' tour backed by numpy int32 arrays, with O(1) position lookup.
+    order[p] is the city at position p and pos[v] is the position of city v.
+    It can be read like a list (len, iteration, indexing by position), so the list based code keeps working.
+    '''
+
+    def __init__(self, cities):
+        '''
+        cities: sequence with the cities in the order they are visited
+        '''
+        self.order = np.array(cities, dtype=np.int32)
+        self.pos = np.full(self.order.max() + 1 if len(self.order) else 0, -1, dtype=np.int32)
+        self.pos[self.order] = np.arange(len(self.order), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __iter__(self):
+        return iter(self.order.tolist())
+
+    def __getitem__(self, p):
+        ''' city at position p (or an array of cities if p is a slice) '''
+        return self.order[p]
+
+    def __array__(self, dtype=None, copy=None):
+        ''' the order array, a copy if copy is true (np.array(tour) must not alias the tour) '''
+        if dtype is None:
+            return self.order.copy() if copy else self.order
+        return self.order.astype(dtype, copy=bool(copy))
+
+    def __repr__(self) -> str:
+        return f"Tour({self.order.tolist()})"
+
+    def tolist(self) -> list:
+        return self.order.tolist()
+
+    def copy(self) -> 'Tour':
+        return Tour(self.order)
+
+    def next(self, v: int) -> int:
+        ''' city after v '''
+        p = self.pos[v] + 1
+        return self.order[p if p < len(self.order) else 0]
+
+    def prev(self, v: int) -> int:
+        ''' city before v '''
+        return self.order[self.pos[v] - 1]
+
+    def between(self, a: int, b: int, c: int) -> bool:
+        ''' True if b is on the path from a to c, going forward '''
+        pa, pb, pc = self.pos[a], self.pos[b], self.pos[c]
+        if pa <= pc:
+            return pa <= pb <= pc
+        return pb >= pa or pb <= pc
+
+    def cost(self, c: np.ndarray) -> float:
+        ''' cost of the tour
+        c: cost matrix
+        '''
+        return c[self.order, np.roll(self.order, -1)].sum()
+
+    def reverse(self, i: int, j: int) -> None:
+        ''' reverse the tour from position i to position j (going forward, wrapping around the end).
+        The complementary segment is reversed instead when it is shorter, which gives the same cycle.
+        '''
+        order, pos = self.order, self.pos
+        n = len(order)
+        size = (j - i) % n + 1  # number of cities in the segment
+        if 2*size > n:  # reverse the complement instead
+            i, j = (j+1) % n, (i-1) % n
+            size = n - size
+        if size < 2:
+            return
+        if i <= j:
+            order[i:j+1] = order[i:j+1][::-1]
+            pos[order[i:j+1]] = np.arange(i, j+1)
+        else:  # the segment wraps around the end of the array
+            idx = np.r_[i:n, 0:j+1]
+            order[idx] = order[idx[::-1]]
+            pos[order[idx]] = idx
+
+    def reverse_path(self, a: int, b: int) -> None:
+        ''' reverse the path from city a to city b (going forward) '''
+        self.reverse(self.pos[a], self.pos[b])
+
+    def move(self, a: int, b: int) -> None:
+        ''' move city a to the position right after city b, shifting the shorter side of the tour '''
+        self.move_segment(a, a, b)
+
+    def move_segment(self, a: int, b: int, u: int, reverse: bool = False) -> None:
+        ''' move the path from city a to city b (going forward) to between city u and its successor,
+        optionally reversed, shifting the shorter side of the tour
+        '''
+        order, pos = self.order, self.pos
+        n = len(order)
+        i, j, k = pos[a], pos[b], pos[u]
+        size = (j - i) % n + 1  # number of cities in the segment
+        fwd = (k - j) % n  # number of cities after b, up to u
+        if fwd <= n - size - fwd:  # shift the cities after b (up to u) back by size positions
+            idx = (i + np.arange(size + fwd)) % n
+            block = order[idx]
+            seg = block[:size]
+            order[idx] = np.concatenate((block[size:], seg[::-1] if reverse else seg))
+        else:  # shift the cities after u (up to a) forward by size positions
+            m = n - size - fwd  # number of cities strictly between u and a
+            idx = (k + 1 + np.arange(m + size)) % n
+            block = order[idx]
+            seg = block[m:]
+            order[idx] = np.concatenate((seg[::-1] if reverse else seg, block[:m]))
+        pos[order[idx]] = idx
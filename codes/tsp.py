@@ -1,15 +1,22 @@
 from scip_tsp import make_random_instance, plot_tour, tsp_adhoc_subtours
+from spatial import knn_points
+from tour import Tour
+from collections import deque
+import heapq
 import numpy as np
+import math
+import time
 
-def nearest_neighbor(c:np.ndarray)->list:
+def nearest_neighbor(c:np.ndarray, start:int = 0)->list:
     ''' find a tour using the nearest neighbor heuristic
     c: cost matrix
+    start: first city of the tour
     return: a list with the tour
     '''
     n = len(c) # number of cities
-    unvisited = set(range(1,n)) # set of unvisited cities (all except 0)
-    tour = [0] # start at city 0
-    current = 0 # current city
+    unvisited = set(range(n)) - {start} # set of unvisited cities (all except start)
+    tour = [start] # start at city start
+    current = start # current city
     while unvisited:
         # witch unvisited city is the nearest?
         next = min(unvisited, key=lambda j: c[current,j])
@@ -22,10 +29,12 @@ def nearest_neighbor(c:np.ndarray)->list:
 def best_insertion(c:np.ndarray, ins_order:list,points:np.ndarray=None)->list:
     ''' find a tour using the best insertion heuristic, with a given order of the cities
     c: cost matrix
-    ins_order: order of the cities to be inserted
+    ins_order: order of the cities to be inserted (list or Tour)
     points: coordinates of the cities (for plotting only)
-    return: a list with the tour
+    return: a list with the tour (a Tour if ins_order is a Tour)
     '''
+    if isinstance(ins_order, Tour):
+        return Tour(best_insertion(c, ins_order.tolist(), points))
     n = len(c) # number of cities
     if n < len(ins_order):
         raise ValueError("The number of cities is less than the number of cities to be inserted")
@@ -80,10 +89,103 @@ def furthest_order(c:np.ndarray)->list:
         dist[k] = -1 # sinalize that k is already in the tour
     return order
 
+def insertion(c:np.ndarray, policy:str = 'cheapest', order:list = None, seed:int = None)->list:
+    ''' find a tour with an insertion heuristic, keeping for each city out of the tour its best insertion edge.
+    After each insertion only the two new edges are evaluated for every city (vectorized). A city whose best 
+    edge was removed keeps its old cost as a lower bound, and its best edge is recomputed over the whole tour 
+    only when it is about to be inserted. Each step costs O(n) numpy operations instead of a scan of the tour.
+    c: cost matrix (symmetric) or DistanceOracle
+    policy: which city is inserted next: 'cheapest' (smallest insertion cost, taken from a heap), 
+            'farthest' (the order of furthest_order) or 'random' (random order)
+    order: insertion order for the 'farthest' and 'random' policies (optional)
+    seed: seed of the random order
+    return: a list with the tour
+    '''
+    n = len(c) # number of cities
+    if n <= 3:
+        return list(range(n))
+    if policy == 'farthest' and order is None:
+        order = furthest_order(c)
+    elif policy == 'random' and order is None:
+        order = np.random.default_rng(seed).permutation(n).tolist()
+    elif policy == 'cheapest':
+        row = np.array(c[0], dtype=float)
+        row[0] = np.inf
+        order = [0, int(np.argmin(row))] # start with city 0 and its nearest city
+    elif policy not in ('farthest', 'random'):
+        raise ValueError("Unknown insertion policy: " + policy)
+    start = [int(v) for v in order[:2 if policy == 'cheapest' else 3]]
+    succ = np.full(n, -1) # succ[v] is the city after v in the tour (edge (v, succ[v]))
+    succ[start] = np.roll(start, -1)
+    in_tour = np.zeros(n, dtype=bool)
+    in_tour[start] = True
+    # best insertion cost of each city and the first city of its best edge
+    best_cost = np.full(n, np.inf)
+    best_edge = np.full(n, -1)
+    stale = np.zeros(n, dtype=bool) # the best edge was removed, best_cost is a lower bound
+    def recompute(cities):
+        ''' best insertion edge of the cities over the whole tour '''
+        tails = np.flatnonzero(in_tour)
+        heads = succ[tails]
+        costs = c[tails[:, None], cities] + c[heads[:, None], cities] - c[tails, heads][:, None]
+        k = np.argmin(costs, axis=0)
+        best_cost[cities] = costs[k, np.arange(len(cities))]
+        best_edge[cities] = tails[k]
+        stale[cities] = False
+    recompute(np.flatnonzero(~in_tour))
+    heap = [(best_cost[u], u) for u in np.flatnonzero(~in_tour).tolist()]
+    heapq.heapify(heap)
+    k = len(start)
+    for _ in range(n - len(start)):
+        if policy == 'cheapest':
+            while True:
+                cost_x, x = heapq.heappop(heap)
+                if in_tour[x] or cost_x != best_cost[x]: # outdated entry
+                    continue
+                if not stale[x]:
+                    break
+                recompute([x]) # the lower bound is at the top, compute the real cost
+                heapq.heappush(heap, (best_cost[x], x))
+        else:
+            x = int(order[k])
+            k += 1
+            if stale[x]:
+                recompute([x])
+        # insert x between a and b
+        a = best_edge[x]
+        b = succ[a]
+        succ[a], succ[x] = x, b
+        in_tour[x] = True
+        best_cost[x] = np.inf
+        out = ~in_tour
+        # cities whose best edge (a,b) was removed, every other edge costs at least their old best cost
+        stale[out & (best_edge == a)] = True
+        # insertion in the new edges (a,x) and (x,b), better than the lower bound of a stale city means the best
+        row_x = c[x]
+        cost_ax = c[a] + row_x - c[a, x]
+        cost_xb = row_x + c[b] - c[x, b]
+        better_a = out & (cost_ax < best_cost)
+        best_cost[better_a] = cost_ax[better_a]
+        best_edge[better_a] = a
+        better_b = out & (cost_xb < best_cost)
+        best_cost[better_b] = cost_xb[better_b]
+        best_edge[better_b] = x
+        better = better_a | better_b
+        stale[better] = False
+        if policy == 'cheapest':
+            for u in np.flatnonzero(better).tolist():
+                heapq.heappush(heap, (best_cost[u], u))
+    # follow the successors to build the tour
+    tour = [start[0]]
+    for _ in range(n - 1):
+        tour.append(int(succ[tour[-1]]))
+    return tour
+
+
 def or_opt(c:np.ndarray, tour:list)->bool:
     ''' search for a improving move in the tour using or-opt, returning True at the first improving move found
     c: cost matrix
-    tour: current tour to be improved, will be modified in place
+    tour: current tour to be improved (list or Tour), will be modified in place
     return: True if an improving move is found, False otherwise
     '''
     n = len(c) # number of cities
@@ -101,7 +203,10 @@ def or_opt(c:np.ndarray, tour:list)->bool:
             add_delta = -c[tour[ant_j],tour[j]] \
                         +c[tour[ant_j],tour[i]] + c[tour[i],tour[j]]
             if add_delta + rem_delta < -1e-6: # if the move is improving
-                if i < j:
+                if isinstance(tour, Tour):
+                    # move i between j-1 and j, shifting the shorter side of the tour
+                    tour.move(tour[i], tour[ant_j])
+                elif i < j:
                     # first remove i, then insert it in position j
                     tour.insert(j, tour[i])
                     tour.pop(i)
@@ -120,7 +225,7 @@ def or_opt(c:np.ndarray, tour:list)->bool:
 def two_opt(c:np.ndarray, tour:list)->bool:
     ''' search for a improving move in the tour using 2-opt, returning True at the first improving move found
     c: cost matrix
-    tour: current tour to be improved, will be modified in place
+    tour: current tour to be improved (list or Tour), will be modified in place
     return: True if an improving move is found, False otherwise
     '''
     n = len(c) # number of cities
@@ -130,7 +235,9 @@ def two_opt(c:np.ndarray, tour:list)->bool:
             delta = c[tour[i],tour[j]] + c[tour[i+1],tour[(j+1)%n]] \
                     -c[tour[i],tour[i+1]] - c[tour[j],tour[(j+1)%n]]
             if delta < -1e-6:
-                if j == n-1:
+                if isinstance(tour, Tour):
+                    tour.reverse(i+1, j) # reverses the shorter side
+                elif j == n-1:
                     tour[i+1:] = tour[i+1:][::-1]
                     print('opa')
                 else:
@@ -144,17 +251,120 @@ def two_opt(c:np.ndarray, tour:list)->bool:
     return False
                     
 
-def VND(c:np.ndarray, tour:list, points:np.ndarray = None)->None:
+def two_opt_np(c:np.ndarray, tour:list, best:bool = False, max_matrix:int = 2000)->bool:
+    ''' search for an improving 2-opt move, evaluating the deltas of a whole row of moves at once with numpy
+    c: cost matrix
+    tour: current tour to be improved (list or Tour), will be modified in place
+    best: if True, apply the best improving move of the whole neighborhood (best improvement),
+          otherwise apply the best move of the first row with an improving move (first improvement)
+    max_matrix: for best improvement with up to max_matrix cities, all the deltas are computed as a single n x n matrix
+    return: True if an improving move is found, False otherwise
+    '''
+    n = len(tour) # number of cities
+    if n < 4:
+        return False
+    if __debug__: custo_ini = cost(c, tour) # initial cost for debug only
+    t = np.array(tour) # t[i] is the city at position i
+    s = np.roll(t, -1) # s[i] is the city after position i
+    e = c[t, s] # e[i] is the cost of the edge (t[i], s[i])
+    min_delta, min_i, min_j = -1e-6, -1, -1
+    if best and n <= max_matrix:
+        # delta[i, j] of replacing edges (t[i],s[i]) and (t[j],s[j]) by (t[i],t[j]) and (s[i],s[j])
+        delta = c[t[:, None], t] + c[s[:, None], s] - e[:, None] - e
+        delta[np.tril_indices(n, 1)] = 0 # only j >= i+2
+        delta[0, n-1] = 0 # adjacent edges
+        k = np.argmin(delta)
+        if delta.flat[k] < min_delta:
+            min_delta = delta.flat[k]
+            min_i, min_j = divmod(k, n)
+    else:
+        for i in range(n-2):
+            j = np.arange(i+2, n-(i==0)) # i+2 to avoid adjacent edges and n-1 if i==0
+            delta = c[t[i], t[j]] + c[s[i], s[j]] - e[i] - e[j]
+            k = np.argmin(delta)
+            if delta[k] < min_delta:
+                min_delta, min_i, min_j = delta[k], i, j[k]
+                if not best:
+                    break
+    if min_i < 0:
+        return False
+    if isinstance(tour, Tour):
+        tour.reverse(min_i+1, min_j)
+    else:
+        tour[min_i+1:min_j+1] = tour[min_i+1:min_j+1][::-1]
+    if __debug__:
+        delta_real = cost(c, tour) - custo_ini # for debug only
+        if not np.isclose(min_delta, delta_real):
+            raise ValueError("2-opt move error")
+    return True
+
+
+def or3_opt(c:np.ndarray, tour:list, max_len:int = 3)->bool:
+    ''' search for an improving move of a segment of 1 to max_len consecutive cities (possibly reversed) 
+    to another place of the tour, returning True at the first improving move found.
+    The deltas of all the places of a segment are computed at once, in O(1) each.
+    c: cost matrix
+    tour: current tour to be improved (list or Tour), will be modified in place
+    max_len: maximum number of cities in the segment
+    return: True if an improving move is found, False otherwise
+    '''
+    n = len(tour) # number of cities
+    if __debug__: custo_ini = cost(c, tour) # initial cost for debug only
+    t = np.array(tour) # t[i] is the city at position i
+    s = np.roll(t, -1) # s[i] is the city after position i
+    e = c[t, s] # e[i] is the cost of the edge (t[i], s[i])
+    for size in range(1, min(max_len, n-3)+1):
+        for i in range(n): # segment from position i to i+size-1
+            x, y = t[i], t[(i+size-1) % n] # first and last cities of the segment
+            p, q = t[i-1], t[(i+size) % n] # cities before and after the segment
+            rem_delta = c[p, q] - c[p, x] - c[y, q]
+            if rem_delta >= 0: # no improvement is possible (triangle inequality)
+                continue
+            j = (i + size + np.arange(n - size - 1)) % n # edges (t[j], s[j]) outside the segment
+            add_delta = c[t[j], x] + c[y, s[j]] - e[j] # insert x ... y between t[j] and s[j]
+            k = np.argmin(add_delta)
+            reverse = False
+            if size > 1: # insert y ... x between t[j] and s[j]
+                add_rev = c[t[j], y] + c[x, s[j]] - e[j]
+                k_rev = np.argmin(add_rev)
+                if add_rev[k_rev] < add_delta[k]:
+                    k, add_delta, reverse = k_rev, add_rev, True
+            delta = add_delta[k] + rem_delta
+            if delta < -1e-6:
+                u = t[j[k]]
+                if isinstance(tour, Tour):
+                    tour.move_segment(x, y, u, reverse)
+                else:
+                    seg = t[(i + np.arange(size)) % n]
+                    rest = np.roll(t, -(i+size))[:n-size] # tour without the segment, starting at q
+                    at = int(np.flatnonzero(rest == u)[0]) + 1
+                    tour[:] = np.concatenate((rest[:at], seg[::-1] if reverse else seg, rest[at:])).tolist()
+                if __debug__:
+                    delta_real = cost(c, tour) - custo_ini # for debug only
+                    if not np.isclose(delta, delta_real):
+                        raise ValueError("OR-3opt inconsistency")
+                return True
+    return False
+
+
+def VND(c:np.ndarray, tour:list, points:np.ndarray = None, neighborhoods:list = None, trajectory:list = None)->None:
     ''' perform a Variable Neighborhood Descent in the tour to improve it 
     c: cost matrix
-    tour: current tour to be improved, will be modified in place
+    tour: current tour to be improved (list or Tour), will be modified in place
     points: coordinates of the points (for plotting only)
+    neighborhoods: list of neighborhood functions f(c, tour)->bool, in the order they are tried 
+                   (default: two_opt and or_opt, e.g. [two_opt_np, or3_opt] converges in fewer passes)
+    trajectory: if given, (elapsed time, cost) is appended after each improving move
     '''
     # define the neighborhoods
-    neighborhoods = [two_opt, or_opt]
+    if neighborhoods is None:
+        neighborhoods = [two_opt, or_opt]
+    start = time.time()
     while True:
         for neighborhood in neighborhoods:
             if neighborhood(c, tour):
+                if trajectory is not None:
+                    trajectory.append((time.time() - start, cost(c, tour)))
                 if points is not None: # plot the tour if points are given
                     plot_tour(points, tour)
                 if __debug__: # print the cost for debug only
@@ -162,7 +372,315 @@ def VND(c:np.ndarray, tour:list, points:np.ndarray = None)->None:
                 break # go back to the first neighborhood
         else: # if no improving move was found in any neighborhood
             break # stop the search
-        
+
+
+def neighbor_lists(c: np.ndarray, k: int = 10) -> np.ndarray:
+    ''' find the k nearest neighbors of each city (candidate lists)
+    c: cost matrix
+    k: number of neighbors of each city
+    return: a (n, k) array with the neighbors of each city, sorted by increasing cost
+    '''
+    n = len(c) # number of cities
+    k = min(k, n-1)
+    neighbors = np.empty((n, k), dtype=np.int32)
+    for i in range(n): # row by row to avoid a n x n temporary
+        row = c[i].copy()
+        row[i] = np.inf # a city is not its own neighbor
+        idx = np.argpartition(row, k-1)[:k]
+        neighbors[i] = idx[np.argsort(row[idx])]
+    return neighbors
+
+
+def _dist_fn(c: np.ndarray, points: np.ndarray):
+    ''' return a function d(i, j) with the cost between two cities, 
+    from the cost matrix if given, or from the coordinates of the points otherwise '''
+    if c is not None:
+        return lambda i, j: c[i, j]
+    x = points[:, 0].tolist()
+    y = points[:, 1].tolist()
+    return lambda i, j: math.hypot(x[i]-x[j], y[i]-y[j])
+
+
+def _two_opt_move(d, tour: Tour, neighbors: np.ndarray, a: int) -> tuple:
+    ''' search for an improving 2-opt move that adds an edge from city a to one of its neighbors,
+    applying the first one found
+    d: cost function d(i, j)
+    tour: current tour, will be modified in place
+    neighbors: candidate lists
+    a: city
+    return: tuple (gain, cities touched by the move), or (0, ()) if no improving move was found
+    '''
+    for forward in (True, False):
+        b = tour.next(a) if forward else tour.prev(a) # a's successor (or predecessor)
+        d_ab = d(a, b)
+        for cc in neighbors[a]:
+            d_ac = d(a, cc)
+            if d_ac >= d_ab: # neighbors are sorted, no gain is possible from here on
+                break
+            dd = tour.next(cc) if forward else tour.prev(cc)
+            if dd == a or cc == b:
+                continue
+            # replace edges (a,b) and (cc,dd) by (a,cc) and (b,dd)
+            delta = d_ac + d(b, dd) - d_ab - d(cc, dd)
+            if delta < -1e-9:
+                if forward: # a b ... cc dd -> a cc ... b dd
+                    tour.reverse_path(b, cc)
+                else: # dd cc ... b a -> dd b ... cc a
+                    tour.reverse_path(cc, b)
+                return -delta, (a, b, cc, dd)
+    return 0, ()
+
+
+def _or_opt_move(d, tour: Tour, neighbors: np.ndarray, a: int, max_len: int = 1) -> tuple:
+    ''' search for an improving move of a segment of 1 to max_len cities starting (or ending) at city a,
+    to a place where a is next to one of its neighbors, possibly reversed, applying the first one found
+    d: cost function d(i, j)
+    tour: current tour, will be modified in place
+    neighbors: candidate lists
+    a: city
+    max_len: maximum number of cities in the segment
+    return: tuple (gain, cities touched by the move), or (0, ()) if no improving move was found
+    '''
+    n = len(tour)
+    for forward in ((True, False) if max_len > 1 else (True,)):
+        x = y = a # first and last cities of the segment, in tour order
+        for size in range(1, max_len+1):
+            if size + 3 > n:
+                break
+            if size > 1: # grow the segment away from a
+                if forward:
+                    y = tour.next(y)
+                else:
+                    x = tour.prev(x)
+            p, q = tour.prev(x), tour.next(y) # neighbors of the segment in the tour
+            rem_gain = d(p, x) + d(y, q) - d(p, q) # gain of removing the segment
+            for cc in neighbors[a]:
+                d_ac = d(a, cc)
+                if d_ac >= rem_gain: # neighbors are sorted, no gain is possible from here on
+                    break
+                if tour.between(x, cc, y): # cc is in the segment
+                    continue
+                for u, v in ((cc, tour.next(cc)), (tour.prev(cc), cc)): # insert between u and v
+                    if v == x or u == y: # edges (p,x) and (y,q) are removed
+                        continue
+                    reverse = (u == cc) == (a == y) # a must be next to cc
+                    if reverse: # u y ... x v
+                        add = d(u, y) + d(x, v) - d(u, v)
+                    else: # u x ... y v
+                        add = d(u, x) + d(y, v) - d(u, v)
+                    if add - rem_gain < -1e-9:
+                        tour.move_segment(x, y, u, reverse)
+                        return rem_gain - add, (p, q, x, y, u, v)
+    return 0, ()
+
+
+def _tour_cost(c: np.ndarray, points: np.ndarray, tour: list) -> float:
+    ''' cost of the tour, from the cost matrix if given, or from the coordinates of the points otherwise '''
+    if c is not None:
+        return cost(c, tour)
+    x = points[np.asarray(tour)]
+    return np.linalg.norm(x - np.roll(x, -1, axis=0), axis=1).sum()
+
+
+def _dlb_search(d, tour: Tour, neighbors: np.ndarray, moves: list, trajectory: list = None, tour_cost: float = 0,
+                queue: list = None) -> bool:
+    ''' apply the moves around each city until no improving move is found, using don't-look bits:
+    only the cities in the queue are searched, and the endpoints of the changed edges are queued again.
+    d: cost function d(i, j)
+    tour: current tour, will be modified in place
+    neighbors: candidate lists
+    moves: list of functions move(d, tour, neighbors, a) -> (gain, touched cities)
+    trajectory: if given, (elapsed time, cost) is appended after each improving move
+    tour_cost: initial cost of the tour (for the trajectory only)
+    queue: cities searched first (default: all the cities)
+    return: True if the tour was improved, False otherwise
+    '''
+    start = time.time()
+    queue = deque(tour.tolist() if queue is None else queue)
+    active = np.zeros(len(tour), dtype=bool)
+    active[list(queue)] = True
+    improved = False
+    while queue:
+        a = queue.popleft()
+        active[a] = False
+        for move in moves:
+            gain, touched = move(d, tour, neighbors, a)
+            if touched:
+                improved = True
+                if trajectory is not None:
+                    tour_cost -= gain
+                    trajectory.append((time.time() - start, tour_cost))
+                for v in touched: # the endpoints of the changed edges must be searched again
+                    if not active[v]:
+                        active[v] = True
+                        queue.append(v)
+                break
+    return improved
+
+
+def VND_nl(c: np.ndarray, tour: list, k: int = 10, points: np.ndarray = None,
+           neighbors: np.ndarray = None, neighborhoods: tuple = ('2opt', 'or3opt'), trajectory: list = None,
+           queue: list = None) -> bool:
+    ''' perform a local search with 2-opt and or-opt restricted to candidate lists, using don't-look bits.
+    Only the moves that add an edge between a city and one of its k nearest neighbors are evaluated.
+    c: cost matrix, or None to compute the costs from the points (for large instances)
+    tour: current tour to be improved (list or Tour), will be modified in place
+    k: number of neighbors of each city
+    points: coordinates of the cities (needed if c is None)
+    neighbors: precomputed candidate lists (optional)
+    neighborhoods: neighborhoods to be used, among '2opt', 'oropt' (one city) and 'or3opt' (segments of 1 to 3 cities)
+    trajectory: if given, (elapsed time, cost) is appended after each improving move
+    queue: cities searched first, e.g. the endpoints of the edges changed by a perturbation (default: all)
+    return: True if the tour was improved, False otherwise
+    '''
+    n = len(tour)
+    if n < 5:
+        return False
+    if neighbors is None:
+        neighbors = neighbor_lists(c, k) if c is not None else knn_points(points, k)
+    d = _dist_fn(c, points)
+    moves = {'2opt': _two_opt_move, 'oropt': _or_opt_move,
+             'or3opt': lambda *args: _or_opt_move(*args, max_len=3)}
+    moves = [moves[name] for name in neighborhoods]
+    t = tour if isinstance(tour, Tour) else Tour(tour)
+    tour_cost = _tour_cost(c, points, t) if trajectory is not None else 0
+    improved = _dlb_search(d, t, neighbors, moves, trajectory, tour_cost, queue)
+    if t is not tour:
+        tour[:] = t.tolist()
+    return improved
+
+
+def two_opt_nl(c: np.ndarray, tour: list, k: int = 10, points: np.ndarray = None, neighbors: np.ndarray = None) -> bool:
+    ''' 2-opt local search restricted to candidate lists, see VND_nl
+    return: True if the tour was improved, False otherwise
+    '''
+    return VND_nl(c, tour, k, points, neighbors, neighborhoods=('2opt',))
+
+
+def or_opt_nl(c: np.ndarray, tour: list, k: int = 10, points: np.ndarray = None, neighbors: np.ndarray = None) -> bool:
+    ''' or-opt local search restricted to candidate lists, see VND_nl
+    return: True if the tour was improved, False otherwise
+    '''
+    return VND_nl(c, tour, k, points, neighbors, neighborhoods=('oropt',))
+
+
+def _lk_move(d, tour: Tour, neighbors: np.ndarray, t1: int, max_depth: int = 50, breadth: tuple = (5, 3)) -> tuple:
+    ''' search for an improving Lin-Kernighan move starting at city t1: a sequence of 2-opt flips 
+    (a sequential 3-opt move at depth 2 and so on) built while the partial gain is positive.
+    The best closed tour found along the sequence is kept.
+    d: cost function d(i, j)
+    tour: current tour, will be modified in place
+    neighbors: candidate lists
+    t1: city
+    max_depth: maximum number of flips in a move
+    breadth: number of alternatives tried at the first levels (1 at deeper levels)
+    return: tuple (gain, cities touched by the move), or (0, ()) if no improving move was found
+    '''
+    def edge(u, v):
+        return (u, v) if u < v else (v, u)
+
+    def flip(t1, t2, t3, t4):
+        # remove (t1,t2) and (t4,t3), add (t2,t3) and (t1,t4), t2 next to t1 and t4 before t3 (same direction)
+        if tour.next(t1) == t2:
+            tour.reverse_path(t2, t4)
+        else:
+            tour.reverse_path(t4, t2)
+
+    def step(t2, G, level):
+        # edge (t1,t2) is the one to be closed, G is the gain so far without closing it
+        fwd = tour.next(t1) == t2
+        cands = []
+        for t3 in neighbors[t2]:
+            g1 = G - d(t2, t3)
+            if g1 <= 0: # neighbors are sorted, positive gain criterion
+                break
+            t4 = tour.prev(t3) if fwd else tour.next(t3)
+            if t3 == t1 or t4 == t2 or edge(t2, t3) in removed or edge(t3, t4) in added:
+                continue
+            cands.append((d(t3, t4) - d(t2, t3), t3, t4, g1))
+        cands.sort(reverse=True)
+        for _, t3, t4, g1 in cands[:breadth[level] if level < len(breadth) else 1]:
+            flip(t1, t2, t3, t4)
+            flips.append((t2, t3, t4))
+            added.add(edge(t2, t3))
+            removed.add(edge(t3, t4))
+            G2 = g1 + d(t3, t4)
+            if G2 - d(t4, t1) > best[0] + 1e-9: # close the tour with edge (t4,t1)
+                best[:] = [G2 - d(t4, t1), len(flips)]
+            if level + 1 < max_depth:
+                step(t4, G2, level + 1)
+            if best[0] > 0: # keep the flips, the ones after the best closing are undone by the caller
+                return
+            flips.pop()
+            added.discard(edge(t2, t3))
+            removed.discard(edge(t3, t4))
+            flip(t1, t4, t3, t2) # undo
+
+    for t2 in (tour.next(t1), tour.prev(t1)):
+        flips = []
+        added, removed = set(), {edge(t1, t2)}
+        best = [0, 0] # best gain and number of flips to reach it
+        step(t2, d(t1, t2), 0)
+        if best[0] > 0:
+            while len(flips) > best[1]: # undo the flips after the best closing
+                t2_, t3, t4 = flips.pop()
+                flip(t1, t4, t3, t2_)
+            return best[0], (t1,) + sum(flips, ())
+    return 0, ()
+
+
+def LK(c: np.ndarray, tour: list, k: int = 10, points: np.ndarray = None, neighbors: np.ndarray = None,
+       max_depth: int = 50, breadth: tuple = (5, 3), trajectory: list = None, queue: list = None) -> bool:
+    ''' Lin-Kernighan style variable depth local search, with candidate lists and don't-look bits.
+    Each city is first searched with Lin-Kernighan moves (sequences of flips, including sequential 3-opt moves)
+    and then with or-opt moves of segments of 1 to 3 cities.
+    c: cost matrix, or None to compute the costs from the points (for large instances)
+    tour: current tour to be improved (list or Tour), will be modified in place
+    k: number of neighbors of each city
+    points: coordinates of the cities (needed if c is None)
+    neighbors: precomputed candidate lists (optional)
+    max_depth: maximum number of flips in a move
+    breadth: number of alternatives tried at the first levels of a move
+    trajectory: if given, (elapsed time, cost) is appended after each improving move
+    queue: cities searched first, e.g. the endpoints of the edges changed by a perturbation (default: all)
+    return: True if the tour was improved, False otherwise
+    '''
+    n = len(tour)
+    if n < 8:
+        return VND_nl(c, tour, k, points, neighbors, trajectory=trajectory, queue=queue)
+    if neighbors is None:
+        neighbors = neighbor_lists(c, k) if c is not None else knn_points(points, k)
+    d = _dist_fn(c, points)
+    moves = [lambda d, t, nb, a: _lk_move(d, t, nb, a, max_depth, breadth),
+             lambda d, t, nb, a: _or_opt_move(d, t, nb, a, max_len=3)]
+    t = tour if isinstance(tour, Tour) else Tour(tour)
+    tour_cost = _tour_cost(c, points, t) if trajectory is not None else 0
+    improved = _dlb_search(d, t, neighbors, moves, trajectory, tour_cost, queue)
+    if t is not tour:
+        tour[:] = t.tolist()
+    return improved
+
+
+def local_search(c: np.ndarray, tour: list, engine: str = 'vnd', points: np.ndarray = None, **kwargs) -> list:
+    ''' improve the tour with one of the local search engines, reporting the cost trajectory
+    c: cost matrix (None is accepted by the 'nl' and 'lk' engines, with points)
+    tour: current tour to be improved (list or Tour), will be modified in place
+    engine: 'vnd' (VND over full neighborhoods), 'nl' (VND_nl, candidate lists) or 'lk' (LK, Lin-Kernighan style)
+    points: coordinates of the cities (for plotting with 'vnd', for the costs with the other engines)
+    kwargs: extra arguments of the engine
+    return: list of (elapsed time, cost) after each improving move
+    '''
+    trajectory = []
+    if engine == 'vnd':
+        VND(c, tour, points, trajectory=trajectory, **kwargs)
+    elif engine == 'nl':
+        VND_nl(c, tour, points=points, trajectory=trajectory, **kwargs)
+    elif engine == 'lk':
+        LK(c, tour, points=points, trajectory=trajectory, **kwargs)
+    else:
+        raise ValueError("Unknown local search engine: " + engine)
+    return trajectory
+
 
 if __name__ == "__main__":
     np.random.seed(42)
@@ -0,0 +1,135 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from scip_tsp import make_random_instance, plot_tour
+from tsp import nearest_neighbor, best_insertion, cost, neighbor_lists, LK, VND_nl
+from tour import Tour
+import numpy as np
+import os
+import time
+
+# cost matrix of the worker process, a view of the shared memory block created by multi_start_ils
+_c = None
+_shm = None
+
+
+def _attach(name: str, shape: tuple, dtype: str) -> None:
+    ''' attach the worker process to the shared cost matrix (pool initializer) '''
+    global _c, _shm
+    try:
+        _shm = shared_memory.SharedMemory(name=name, track=False)  # python >= 3.13
+    except TypeError:
+        _shm = shared_memory.SharedMemory(name=name)
+    _c = np.ndarray(shape, dtype=dtype, buffer=_shm.buf)
+
+
+def double_bridge(tour: list, rng: np.random.Generator, endpoints: list = None) -> list:
+    ''' perturb a tour with a random double-bridge move: A B C D -> A C B D
+    tour: list (or Tour) with the tour
+    rng: random number generator
+    endpoints: if given, the endpoints of the changed edges are appended (the edge from D to A is kept)
+    return: a new list (or Tour) with the perturbed tour
+    '''
+    n = len(tour)
+    i, j, k = np.sort(rng.choice(np.arange(1, n), 3, replace=False)).tolist()
+    if endpoints is not None:
+        endpoints.extend(int(tour[p % n]) for p in (i - 1, i, j - 1, j, k - 1, k))
+    if isinstance(tour, Tour):
+        return Tour(np.concatenate((tour[:i], tour[j:k], tour[i:j], tour[k:])))
+    return tour[:i] + tour[j:k] + tour[i:j] + tour[k:]
+
+
+def ils(c: np.ndarray, start: str = 'nn', iters: int = 100, engine: str = 'lk', k: int = 10, seed: int = 0) -> dict:
+    ''' iterated local search: build a starting tour, improve it, then repeatedly perturb the best tour
+    with a double-bridge kick and improve it again. The tour is kept as a Tour, and after a kick only the
+    endpoints of the changed edges are queued for the local search (the rest of the tour is still a local optimum).
+    c: cost matrix
+    start: starting tour, 'nn' (nearest neighbor from a random city) or 'insertion' (best insertion in random order)
+    iters: number of kicks
+    engine: local search, 'lk' (LK) or 'nl' (VND_nl)
+    k: number of neighbors of each city in the candidate lists
+    seed: seed of the random number generator
+    return: dict with the best tour and its statistics
+    '''
+    start_time = time.time()
+    rng = np.random.default_rng(seed)
+    n = len(c)
+    if start == 'nn':
+        tour = nearest_neighbor(c, int(rng.integers(n)))
+    elif start == 'insertion':
+        tour = best_insertion(c, rng.permutation(n).tolist())
+    else:
+        raise ValueError("Unknown starting tour: " + start)
+    neighbors = neighbor_lists(c, k)
+    improve = LK if engine == 'lk' else VND_nl
+    tour = Tour(tour)
+    improve(c, tour, neighbors=neighbors)
+    best_cost = cost(c, tour)
+    start_cost = best_cost
+    for _ in range(iters):
+        endpoints = []
+        candidate = double_bridge(tour, rng, endpoints)
+        improve(c, candidate, neighbors=neighbors, queue=endpoints)
+        candidate_cost = cost(c, candidate)
+        if candidate_cost < best_cost - 1e-9:
+            tour, best_cost = candidate, candidate_cost
+    return {'tour': tour.tolist(), 'cost': best_cost, 'start': start, 'start_cost': start_cost,
+            'seed': seed, 'iters': iters, 'time': time.time() - start_time}
+
+
+def _ils_task(start: str, iters: int, engine: str, k: int, seed: int) -> dict:
+    ''' run ils on the shared cost matrix of the worker process '''
+    result = ils(_c, start, iters, engine, k, seed)
+    result['pid'] = os.getpid()
+    return result
+
+
+def multi_start_ils(c: np.ndarray, n_starts: int = 32, iters: int = 100, workers: int = None,
+                    engine: str = 'lk', k: int = 10, seed: int = 0) -> tuple:
+    ''' multi-start iterated local search, with the starts spread over a pool of processes.
+    The cost matrix is copied once to a shared memory block instead of being pickled for each task.
+    The starts alternate between nearest neighbor and random order insertion tours.
+    c: cost matrix
+    n_starts: number of independent ILS runs
+    iters: number of double-bridge kicks of each run
+    workers: number of processes (default: number of CPUs)
+    engine: local search, 'lk' (LK) or 'nl' (VND_nl)
+    k: number of neighbors of each city in the candidate lists
+    seed: seed of the first run, run s uses seed + s
+    return: tuple - (best cost, best tour, per-worker statistics)
+    '''
+    if not isinstance(c, np.ndarray):  # e.g. a DistanceOracle, its rows can not be shared
+        raise ValueError("multi_start_ils needs the cost matrix as a numpy array (see distance.distance_matrix)")
+    shm = shared_memory.SharedMemory(create=True, size=c.nbytes)
+    try:
+        shared = np.ndarray(c.shape, dtype=c.dtype, buffer=shm.buf)
+        shared[:] = c
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(shm.name, c.shape, c.dtype.str)) as pool:
+            starts = ('nn', 'insertion')
+            futures = [pool.submit(_ils_task, starts[s % 2], iters, engine, k, seed + s) for s in range(n_starts)]
+            results = [f.result() for f in futures]
+        del shared
+    finally:
+        shm.close()
+        shm.unlink()
+    best = min(results, key=lambda r: r['cost'])
+    # statistics of each worker process
+    stats = {}
+    for r in results:
+        s = stats.setdefault(r['pid'], {'runs': 0, 'iters': 0, 'time': 0.0, 'best_cost': np.inf})
+        s['runs'] += 1
+        s['iters'] += r['iters']
+        s['time'] += r['time']
+        s['best_cost'] = min(s['best_cost'], r['cost'])
+    return best['cost'], best['tour'], stats
+
+
+if __name__ == "__main__":
+    np.random.seed(42)
+    points, c = make_random_instance(1000)
+    start = time.time()
+    best_cost, best_tour, stats = multi_start_ils(c, n_starts=8, iters=20)
+    print("Multi-start ILS cost:", best_cost, "time:", time.time() - start)
+    for pid, s in stats.items():
+        print("worker", pid, s)
+    plot_tour(points, best_tour)